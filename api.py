@@ -3,7 +3,6 @@ import sys
 import json
 import logging
 import socket
-import tempfile
 import threading
 import time
 import requests
@@ -11,6 +10,12 @@ from datetime import datetime
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from ml.recommend import recommend_songs, get_therapy_context
+from ml.prediction_log import get_prediction_log
+from ml.prediction_store import get_prediction_store
+from ml.model_registry import registry
+from ml.batcher import batcher_stats
+from ml.circuit_breaker import breaker_stats
+from ml.voice_pool import VoicePoolBusy, get_voice_pool
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,27 +27,22 @@ app = Flask(__name__)
 CORS(app)
 
 # ── Prediction log ─────────────────────────────────────────────────────────────
-_LOGS_DIR     = os.path.join(os.path.dirname(__file__), "ml", "logs")
-_PREDS_FILE   = os.path.join(_LOGS_DIR, "predictions.json")
-_preds_lock   = threading.Lock()
+# Append-only JSONL written by a background thread (see ml/prediction_log.py).
+_prediction_log = get_prediction_log()
+
+# Analytics store fed by the log writer thread (see ml/prediction_store.py).
+try:
+    _prediction_store = get_prediction_store()
+    _prediction_log.add_sink(_prediction_store.as_log_sink(_prediction_log.log_path))
+except Exception as store_err:
+    _prediction_store = None
+    logger.warning("Prediction store unavailable: %s", store_err)
 
 def _log_prediction(entry: dict):
-    """Append one prediction entry to ml/logs/predictions.json (thread-safe)."""
+    """Queue one prediction entry for ml/logs/predictions.jsonl (non-blocking)."""
     try:
-        os.makedirs(_LOGS_DIR, exist_ok=True)
-        with _preds_lock:
-            records = []
-            if os.path.exists(_PREDS_FILE) and os.path.getsize(_PREDS_FILE) > 2:
-                with open(_PREDS_FILE, "r", encoding="utf-8") as f:
-                    try:
-                        records = json.load(f)
-                    except json.JSONDecodeError:
-                        records = []
-            records.append(entry)
-            tmp = _PREDS_FILE + ".tmp"
-            with open(tmp, "w", encoding="utf-8") as f:
-                json.dump(records, f, ensure_ascii=False, separators=(",", ":"))
-            os.replace(tmp, _PREDS_FILE)
+        if not _prediction_log.log(entry):
+            logger.warning("Prediction log queue full; entry dropped")
     except Exception as log_err:
         logger.warning("Prediction logging failed: %s", log_err)
 
@@ -56,10 +56,45 @@ _face_analyzer_full = None
 _face_import_error = None
 _text_import_error = None
 _voice_import_error = None
+_analyzer_lock     = threading.Lock()
 
 _recommend_cache = {}
 _RECOMMEND_TTL_SEC = 300
 
+# Largest accepted encoded image (raw upload or decoded base64).
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(8 * 1024 * 1024)))
+_BASE64_SLACK   = 64 * 1024
+
+# Most texts accepted by one /detect-text-batch request.
+MAX_TEXT_BATCH = int(os.getenv("MAX_TEXT_BATCH", "512"))
+
+# Store the analysed text with /detect-text(-batch) log entries (off by default;
+# used to replay real traffic, e.g. python -m ml.convert_text_model --check).
+LOG_TEXT     = os.getenv("PRED_LOG_TEXT", "0").lower() in ("1", "true", "yes")
+LOG_TEXT_MAX = 2000
+
+# Largest accepted audio payload on /detect-voice (raw body or decoded base64).
+MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES", str(25 * 1024 * 1024)))
+
+# Largest accepted PCM chunk on /detect-voice/stream.
+MAX_AUDIO_CHUNK_BYTES = int(os.getenv("MAX_AUDIO_CHUNK_BYTES", str(1024 * 1024)))
+
+# Accepted sample_rate for raw PCM on /detect-voice(/stream).
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 192000
+
+# Whole-body cap, enforced before Flask parses multipart/JSON: room for the
+# biggest request, a base64 image plus base64 audio on /detect-multimodal.
+app.config["MAX_CONTENT_LENGTH"] = (MAX_IMAGE_BYTES + MAX_AUDIO_BYTES) * 4 // 3 + 2 * _BASE64_SLACK
+
+
+@app.before_request
+def _reject_oversized_body():
+    # Checked up front: inside the endpoints' broad except clauses Werkzeug's
+    # RequestEntityTooLarge would otherwise surface as a 500.
+    if (request.content_length or 0) > app.config["MAX_CONTENT_LENGTH"]:
+        return too_large(None)
+
 
 def read_shared_service_config():
     config_path = os.path.join(os.path.dirname(__file__), "service-config.json")
@@ -78,6 +113,62 @@ def read_shared_ml_port():
     return int(config.get("ports", {}).get("ml", 5001))
 
 
+# ── Quality tiers ─────────────────────────────────────────────────────────────
+# `quality` picks where the face / text / voice cascades start:
+#   best     – strongest model that loaded (transformers, CNN, voice model)
+#   balanced – text skips the transformer tiers (sklearn, then keywords)
+#   fast     – keyword / brightness / energy heuristics only
+# Per-endpoint defaults live in service-config.json "quality"; the response
+# `source` names the tier that actually ran.
+QUALITY_LEVELS   = ("fast", "balanced", "best")
+
+
+def _load_quality_defaults() -> dict:
+    """service-config.json "quality", validated once: bad entries fall back to "best"."""
+    configured = read_shared_service_config().get("quality") or {}
+    if not isinstance(configured, dict):
+        logger.warning("service-config.json \"quality\" must be an object; using \"best\" everywhere")
+        return {}
+    defaults = {}
+    for endpoint, value in configured.items():
+        value = str(value).lower()
+        if value in QUALITY_LEVELS:
+            defaults[endpoint] = value
+        else:
+            logger.warning("service-config.json quality for %s is %r (expected one of: %s); using \"best\"",
+                           endpoint, value, ", ".join(QUALITY_LEVELS))
+    return defaults
+
+
+QUALITY_DEFAULTS = _load_quality_defaults()
+
+
+class InvalidQuality(ValueError):
+    pass
+
+
+def _sample_rate(value) -> int:
+    """A PCM sample_rate option as int; ValueError unless within MIN/MAX_SAMPLE_RATE."""
+    try:
+        rate = int(value)
+    except (TypeError, ValueError):
+        rate = None
+    if rate is None or not MIN_SAMPLE_RATE <= rate <= MAX_SAMPLE_RATE:
+        raise ValueError(f"sample_rate must be an integer from {MIN_SAMPLE_RATE} to {MAX_SAMPLE_RATE} Hz")
+    return rate
+
+
+def _quality(endpoint: str, options=None) -> str:
+    """`quality` from the form/JSON field or query string, else the endpoint default."""
+    value = (options or {}).get("quality") or request.args.get("quality")
+    if not value:
+        return QUALITY_DEFAULTS.get(endpoint, "best")
+    value = str(value).lower()
+    if value not in QUALITY_LEVELS:
+        raise InvalidQuality(f"quality must be one of: {', '.join(QUALITY_LEVELS)}")
+    return value
+
+
 def is_port_available(port, host="127.0.0.1"):
     """Check if a port is available before binding."""
     try:
@@ -94,17 +185,20 @@ def get_face_analyzer():
     global _face_analyzer, _face_analyzer_full, _face_import_error
     if _face_analyzer:
         return _face_analyzer
-    if _face_import_error:
-        return None
-    try:
-        from ml.face_emotion import analyze_face_emotion, _analyze_face_emotion_full
-        _face_analyzer      = analyze_face_emotion
-        _face_analyzer_full = _analyze_face_emotion_full
-        logger.info("Face analyzer loaded successfully")
-    except Exception as exc:
-        _face_import_error = str(exc)
-        logger.warning("Face analyzer unavailable: %s", exc)
-        return None
+    with _analyzer_lock:
+        if _face_analyzer:
+            return _face_analyzer
+        if _face_import_error:
+            return None
+        try:
+            from ml.face_emotion import analyze_face_emotion, _analyze_face_emotion_full
+            _face_analyzer_full = _analyze_face_emotion_full
+            _face_analyzer      = analyze_face_emotion
+            logger.info("Face analyzer loaded successfully")
+        except Exception as exc:
+            _face_import_error = str(exc)
+            logger.warning("Face analyzer unavailable: %s", exc)
+            return None
     return _face_analyzer
 
 
@@ -112,17 +206,20 @@ def get_text_analyzer():
     global _text_analyzer, _text_analyzer_full, _text_import_error
     if _text_analyzer:
         return _text_analyzer
-    if _text_import_error:
-        return None
-    try:
-        from ml.text_emotion import analyze_text_emotion, analyze_text_emotion_full
-        _text_analyzer      = analyze_text_emotion
-        _text_analyzer_full = analyze_text_emotion_full
-        logger.info("Text analyzer loaded successfully")
-    except Exception as exc:
-        _text_import_error = str(exc)
-        logger.warning("Text analyzer unavailable: %s", exc)
-        return None
+    with _analyzer_lock:
+        if _text_analyzer:
+            return _text_analyzer
+        if _text_import_error:
+            return None
+        try:
+            from ml.text_emotion import analyze_text_emotion, analyze_text_emotion_full
+            _text_analyzer_full = analyze_text_emotion_full
+            _text_analyzer      = analyze_text_emotion
+            logger.info("Text analyzer loaded successfully")
+        except Exception as exc:
+            _text_import_error = str(exc)
+            logger.warning("Text analyzer unavailable: %s", exc)
+            return None
     return _text_analyzer
 
 
@@ -130,17 +227,25 @@ def get_voice_analyzer():
     global _voice_analyzer, _voice_analyzer_full, _voice_import_error
     if _voice_analyzer:
         return _voice_analyzer
-    if _voice_import_error:
-        return None
-    try:
-        from ml.voice_emotion import detect_voice_emotion, detect_voice_emotion_full
-        _voice_analyzer      = detect_voice_emotion
-        _voice_analyzer_full = detect_voice_emotion_full
-        logger.info("Voice analyzer loaded successfully")
-    except Exception as exc:
-        _voice_import_error = str(exc)
-        logger.warning("Voice analyzer unavailable: %s", exc)
-        return None
+    with _analyzer_lock:
+        if _voice_analyzer:
+            return _voice_analyzer
+        if _voice_import_error:
+            return None
+        try:
+            from ml.voice_emotion import detect_voice_emotion
+            from ml.voice_pool import detect_voice_emotion_pooled
+            # librosa holds the GIL: analysis runs in worker processes (ml/voice_pool.py).
+            _voice_analyzer_full = detect_voice_emotion_pooled
+            _voice_analyzer      = detect_voice_emotion
+            voice_pool = get_voice_pool()
+            if voice_pool is not None:
+                voice_pool.start()
+            logger.info("Voice analyzer loaded successfully")
+        except Exception as exc:
+            _voice_import_error = str(exc)
+            logger.warning("Voice analyzer unavailable: %s", exc)
+            return None
     return _voice_analyzer
 
 
@@ -155,6 +260,76 @@ def response_error(message, status=400, details=None):
     return jsonify(body), status
 
 
+class ImageTooLarge(ValueError):
+    pass
+
+
+class AudioTooLarge(ValueError):
+    pass
+
+
+def _is_raw_image_request():
+    mimetype = request.mimetype or ""
+    return mimetype == "application/octet-stream" or mimetype.startswith("image/")
+
+
+def _read_capped(stream) -> bytes:
+    raw = stream.read(MAX_IMAGE_BYTES + 1)
+    if len(raw) > MAX_IMAGE_BYTES:
+        raise ImageTooLarge(f"Image exceeds {MAX_IMAGE_BYTES} bytes")
+    return raw
+
+
+def _read_audio_capped(upload) -> bytes:
+    """Read an uploaded audio file, raising AudioTooLarge past MAX_AUDIO_BYTES."""
+    raw = upload.read(MAX_AUDIO_BYTES + 1)
+    if len(raw) > MAX_AUDIO_BYTES:
+        raise AudioTooLarge(f"Audio exceeds {MAX_AUDIO_BYTES} bytes")
+    return raw
+
+
+def _image_from_request(data: dict | None = None, field: str = "image"):
+    """
+    Image payload for the face endpoints, in order of preference:
+      - raw body (application/octet-stream or image/*)  -> bytes
+      - multipart file field `field`                    -> bytes
+      - base64 data URL in the form / JSON field        -> str
+    Raises ImageTooLarge before decoding anything over MAX_IMAGE_BYTES.
+    """
+    if _is_raw_image_request():
+        if request.content_length and request.content_length > MAX_IMAGE_BYTES:
+            raise ImageTooLarge(f"Image exceeds {MAX_IMAGE_BYTES} bytes")
+        return _read_capped(request.stream) or None
+
+    if request.mimetype and "multipart" in request.mimetype:
+        upload = request.files.get(field)
+        if upload:
+            return _read_capped(upload.stream) or None
+        value = request.form.get(field)
+    else:
+        value = (data or {}).get(field)
+
+    if value and len(value) * 3 // 4 > MAX_IMAGE_BYTES + _BASE64_SLACK:
+        raise ImageTooLarge(f"Image exceeds {MAX_IMAGE_BYTES} bytes")
+    return value or None
+
+
+def _face_body_too_large() -> bool:
+    """Early reject for face-only requests, before the body is read or parsed."""
+    length = request.content_length
+    if not length:
+        return False
+    if _is_raw_image_request():
+        return length > MAX_IMAGE_BYTES
+    # base64 JSON / multipart carries up to ~4/3 overhead
+    return length > MAX_IMAGE_BYTES * 4 // 3 + _BASE64_SLACK
+
+
+def _audio_format(filename: str | None) -> str:
+    """Container hint from an upload's filename (defaults to wav)."""
+    return (os.path.splitext(filename or "")[1] or ".wav").lstrip(".").lower()
+
+
 def _cache_key_recommend(emotion: str, count: int, energy: str | None):
     return f"{emotion.lower()}::{count}::{(energy or '').lower()}"
 
@@ -178,18 +353,11 @@ def _set_recommend_cached(emotion: str, count: int, energy: str | None, payload:
 
 def _simple_text_fallback(text):
     """Keyword-based mood detection when ML models are unavailable."""
-    text_lower = text.lower()
-    if any(w in text_lower for w in ["happy", "great", "good", "awesome", "joy", "excited", "wonderful"]):
-        return "Happy"
-    if any(w in text_lower for w in ["sad", "down", "depressed", "cry", "upset", "lonely"]):
-        return "Sad"
-    if any(w in text_lower for w in ["angry", "mad", "furious", "annoyed", "rage"]):
-        return "Angry"
-    if any(w in text_lower for w in ["anxious", "worried", "stress", "nervous", "panic", "fear"]):
-        return "Anxious"
-    if any(w in text_lower for w in ["excited", "thrilled", "amazing", "fantastic"]):
-        return "Excited"
-    return "Calm"
+    from ml.keyword_scorer import score_text
+
+    # First mood (in QUICK_TERMS order) with any whole-word hit wins.
+    quick = score_text(text)["quick"]
+    return next((mood for mood, hits in quick.items() if hits), "Calm")
 
 
 # ─── Error handlers ──────────────────────────────────────────────────────────
@@ -198,6 +366,11 @@ def not_found(e):
     return response_error("Endpoint not found", 404)
 
 
+@app.errorhandler(413)
+def too_large(e):
+    return response_error("Request body too large", 413)
+
+
 @app.errorhandler(500)
 def internal_error(e):
     logger.exception("Internal server error")
@@ -237,18 +410,92 @@ def health():
             "text":  _text_import_error  if not text_available  else None,
             "voice": _voice_import_error if not voice_available else None,
         },
+        "models": registry.stats(),
+        "batching": batcher_stats(),
+        "circuit_breakers": breaker_stats(),
+        "voice_pool": get_voice_pool().stats() if get_voice_pool() else None,
+        "prediction_log": _prediction_log.stats(),
         "timestamp": datetime.utcnow().isoformat() + "Z",
     })
 
 
+# Largest epoch second datetime can represent (9999-12-31T23:59:59Z).
+_MAX_STATS_TS = 253402300799
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    """
+    Aggregate logged predictions from the analytics rollups.
+    Query: window=<seconds, default 3600> | since=<ISO>&until=<ISO>,
+           endpoint, source, emotion, group_by=endpoint|source|emotion,
+           quantiles=0.5,0.95,0.99
+    Returns: { total, by_emotion, by_source, grouped, latency_ms, query_ms }
+             latency_ms is null when filtering or grouping by emotion
+             (the latency rollups are not split by emotion).
+    """
+    if _prediction_store is None:
+        return response_error("Prediction analytics unavailable", 503)
+    try:
+        from ml.prediction_store import parse_ts
+
+        args = request.args
+        until = parse_ts(args["until"]) if args.get("until") else time.time()
+        if args.get("since"):
+            since = parse_ts(args["since"])
+        else:
+            since = until - float(args.get("window", 3600))
+        if not (0 <= since <= until <= _MAX_STATS_TS):
+            return response_error("Invalid stats query", 400, "Need 1970 <= since <= until < year 10000")
+        quantiles = [float(q) for q in args.get("quantiles", "0.5,0.95,0.99").split(",") if q.strip()]
+        if any(not 0 < q <= 1 for q in quantiles):
+            return response_error("Quantiles must be in (0, 1]", 400)
+
+        start_t = time.perf_counter()
+        result = _prediction_store.query(
+            since=since,
+            until=until,
+            endpoint=args.get("endpoint"),
+            source=args.get("source"),
+            emotion=args.get("emotion"),
+            group_by=args.get("group_by"),
+            quantiles=quantiles,
+        )
+        query_ms = round((time.perf_counter() - start_t) * 1000, 2)
+        return response_ok({
+            "window": {
+                "since": datetime.utcfromtimestamp(since).isoformat() + "Z",
+                "until": datetime.utcfromtimestamp(until).isoformat() + "Z",
+            },
+            **result,
+            "query_ms": query_ms,
+        })
+    except ValueError as exc:
+        return response_error("Invalid stats query", 400, str(exc))
+    except Exception as exc:
+        logger.exception("Stats endpoint failure")
+        return response_error("Stats query failed", 500, str(exc))
+
+
 @app.route("/analyze", methods=["POST"])
 def analyze():
     try:
-        data = request.get_json(silent=True) or {}
-        analysis_type = data.get("type")
+        if _is_raw_image_request():
+            # Raw image body: the type travels in the query string (?type=face).
+            data = {}
+            analysis_type = request.args.get("type", "face")
+        elif request.mimetype and "multipart" in request.mimetype:
+            # Multipart upload: 'image' file plus optional 'type' / 'quality' fields.
+            data = request.form
+            analysis_type = request.form.get("type") or request.args.get("type") or "face"
+        else:
+            data = request.get_json(silent=True) or {}
+            analysis_type = data.get("type")
 
         if analysis_type == "face":
-            image_data = data.get("image")
+            if _face_body_too_large():
+                return response_error("Image too large", 413, f"Max {MAX_IMAGE_BYTES} bytes")
+            image_data = _image_from_request(data)
             if not image_data:
                 return response_error("No image data provided", 400)
 
@@ -260,7 +507,7 @@ def analyze():
                     _face_import_error or "face analyzer failed to initialize",
                 )
 
-            mood = analyzer(image_data)
+            mood = analyzer(image_data, quality=_quality("analyze", data))
             if not mood:
                 return response_ok({"mood": "Calm", "source": "fallback", "message": "Face analysis returned no result"})
             return response_ok({"mood": mood, "source": "face"})
@@ -276,13 +523,17 @@ def analyze():
                 mood = _simple_text_fallback(text)
                 return response_ok({"mood": mood, "source": "fallback", "message": "ML text analyzer unavailable, using fallback"})
 
-            mood = analyzer(text)
+            mood = analyzer(text, quality=_quality("analyze", data))
             if not mood:
                 return response_ok({"mood": "Calm", "source": "fallback"})
             return response_ok({"mood": mood, "source": "text"})
 
         return response_error("Invalid analysis type", 400, "Allowed: face, text")
 
+    except ImageTooLarge as exc:
+        return response_error("Image too large", 413, str(exc))
+    except InvalidQuality as exc:
+        return response_error("Invalid quality", 400, str(exc))
     except Exception as exc:
         logger.exception("Analyze endpoint failure")
         return response_error("ML analysis failed", 500, str(exc))
@@ -293,11 +544,19 @@ def detect_face():
     """
     Detect emotion from a face image.
     Body: { "image": "data:image/...;base64,..." }
-    Returns: { emotion, confidence, source }
+       or raw image bytes (application/octet-stream / image/*)
+       or multipart with an 'image' file field
+    Options (JSON / multipart form field or query string):
+      multi_face: true  -> analyse every face (one batched forward pass)
+      max_faces:  N     -> cap on faces per image (≤ FACE_MAX_FACES)
+      quality:    fast | balanced | best (default: service-config.json)
+    Returns: { emotion, confidence, source[, faces: [{emotion, confidence, source, box}]] }
     """
     try:
-        data       = request.get_json(silent=True) or {}
-        image_data = data.get("image")
+        if _face_body_too_large():
+            return response_error("Image too large", 413, f"Max {MAX_IMAGE_BYTES} bytes")
+        data       = {} if _is_raw_image_request() else (request.get_json(silent=True) or {})
+        image_data = _image_from_request(data)
         if not image_data:
             return response_error("No image data provided", 400)
 
@@ -310,8 +569,20 @@ def detect_face():
             return response_error("Face analysis unavailable", 503,
                                   _face_import_error or "face analyzer failed to initialize")
 
+        options    = request.form if request.mimetype and "multipart" in request.mimetype else data
+        multi_face = str(options.get("multi_face") or request.args.get("multi_face") or "").lower() in ("1", "true", "yes")
+        quality    = _quality("detect-face", options)
+
         start_t = time.perf_counter()
-        result = analyzer_full(image_data)
+        if multi_face:
+            from ml.face_emotion import MAX_FACES, analyze_faces
+            try:
+                max_faces = int(options.get("max_faces") or request.args.get("max_faces") or MAX_FACES)
+            except (TypeError, ValueError):
+                return response_error("Invalid max_faces", 400, "max_faces must be an integer")
+            result = analyze_faces(image_data, max_faces=max_faces, quality=quality)
+        else:
+            result = analyzer_full(image_data, quality=quality)
         inference_ms = round((time.perf_counter() - start_t) * 1000, 2)
 
         logger.info(
@@ -325,49 +596,196 @@ def detect_face():
             "emotion":   result["emotion"],
             "confidence": result["confidence"],
             "source":    result["source"],
+            "quality":   quality,
             "inference_ms": inference_ms,
         })
         return response_ok({
             "emotion":    result["emotion"],
             "confidence": result["confidence"],
             "source":     result["source"],
+            "quality":    quality,
             "inference_ms": inference_ms,
+            "timings":    result.get("timings"),
+            **({"faces": result["faces"], "faces_detected": result.get("faces_detected")} if multi_face else {}),
         })
+    except ImageTooLarge as exc:
+        return response_error("Image too large", 413, str(exc))
+    except InvalidQuality as exc:
+        return response_error("Invalid quality", 400, str(exc))
     except Exception as exc:
         logger.exception("detect-face failure")
         return response_error("Face analysis failed", 500, str(exc))
 
 
+def _face_stream_frame(session_id, image, quality: str = "best"):
+    """Run one streamed frame through its session; logs frames that ran inference."""
+    from ml.face_stream import face_streams
+
+    stream = face_streams.get_or_create(session_id)
+    start_t = time.perf_counter()
+    result = stream.process(image, quality=quality)
+    inference_ms = round((time.perf_counter() - start_t) * 1000, 2)
+    if not result.get("skipped"):
+        _log_prediction({
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "endpoint":  "detect-face-stream",
+            "emotion":   result["emotion"],
+            "confidence": result["confidence"],
+            "source":    result["source"],
+            "inference_ms": inference_ms,
+        })
+    return {"session_id": stream.session_id, **result, "inference_ms": inference_ms}
+
+
+@app.route("/detect-face/stream", methods=["POST", "DELETE"])
+def detect_face_stream():
+    """
+    Streaming face emotion over keep-alive HTTP (one frame per request).
+    POST  ?session_id=<id>  body: raw image bytes, multipart 'image' (plus
+          optional 'session_id' / 'quality' fields), or
+          { "image": "data:image/...;base64,...", "session_id": "<id>" }
+          Omit session_id on the first frame; reuse the returned one after.
+          Ids are issued by the server: an unknown or expired session_id
+          starts a new session, so always continue with the returned id.
+    DELETE ?session_id=<id> ends the session.
+    Returns: { session_id, emotion, confidence, distribution, box,
+               skipped, detected, frame, source, timings }
+    """
+    try:
+        if request.method == "DELETE":
+            from ml.face_stream import face_streams
+            closed = face_streams.close(request.args.get("session_id", ""))
+            if closed is None:
+                return response_error("Unknown stream session", 404)
+            return response_ok({"closed": closed})
+
+        if _face_body_too_large():
+            return response_error("Image too large", 413, f"Max {MAX_IMAGE_BYTES} bytes")
+        data = {} if _is_raw_image_request() else (request.get_json(silent=True) or {})
+        image_data = _image_from_request(data)
+        if not image_data:
+            return response_error("No image data provided", 400)
+        if get_face_analyzer() is None:
+            return response_error("Face analysis unavailable", 503,
+                                  _face_import_error or "face analyzer failed to initialize")
+
+        options    = request.form if request.mimetype and "multipart" in request.mimetype else data
+        session_id = request.args.get("session_id") or options.get("session_id")
+        return response_ok(_face_stream_frame(session_id, image_data, _quality("detect-face-stream", options)))
+    except ImageTooLarge as exc:
+        return response_error("Image too large", 413, str(exc))
+    except InvalidQuality as exc:
+        return response_error("Invalid quality", 400, str(exc))
+    except Exception as exc:
+        logger.exception("detect-face stream failure")
+        return response_error("Face stream analysis failed", 500, str(exc))
+
+
+# WebSocket variant (optional dependency: flask-sock). Each connection is one
+# session; send binary JPEG/PNG frames or JSON text {"image": "data:..."}.
+# Connect to /detect-face/ws?quality=fast|balanced|best to pick the tier.
+try:
+    from flask_sock import Sock  # type: ignore
+
+    _sock = Sock(app)
+
+    @_sock.route("/detect-face/ws")
+    def detect_face_ws(ws):
+        from ml.face_stream import face_streams
+
+        try:
+            quality = _quality("detect-face-stream")  # ?quality= on the handshake URL
+        except InvalidQuality as exc:
+            ws.send(json.dumps({"success": False, "error": "Invalid quality", "details": str(exc)}))
+            return
+        if get_face_analyzer() is None:
+            ws.send(json.dumps({"success": False, "error": "Face analysis unavailable"}))
+            return
+        session_id = face_streams.get_or_create().session_id
+        try:
+            while True:
+                message = ws.receive()
+                if message is None:
+                    break
+                if isinstance(message, str):
+                    try:
+                        message = (json.loads(message) or {}).get("image")
+                    except (ValueError, AttributeError):
+                        message = None
+                if (not message or not isinstance(message, (str, bytes))
+                        or len(message) > MAX_IMAGE_BYTES * 4 // 3 + _BASE64_SLACK):
+                    ws.send(json.dumps({"success": False, "error": "Invalid or oversized frame"}))
+                    continue
+                result = _face_stream_frame(session_id, message, quality)
+                # An idle socket can outlive FACE_STREAM_TTL_SEC; follow the
+                # replacement session instead of minting one per frame.
+                session_id = result["session_id"]
+                ws.send(json.dumps({"success": True, **result}))
+        finally:
+            face_streams.close(session_id)
+except ImportError:
+    logger.info("flask-sock not installed; /detect-face/ws disabled (HTTP streaming still available)")
+
+
 @app.route("/detect-voice", methods=["POST"])
 def detect_voice():
     """
     Detect emotion from an audio file upload (multipart) or base64 JSON.
     Multipart: form field 'audio' (file)
     JSON:      { "audio_base64": "...", "format": "wav" }
-    Returns: { emotion, confidence, source }
+    Raw PCM (no container decode; no resampling at 22050 Hz):
+      body application/octet-stream ?sample_rate=48000&dtype=s16|f32
+      or JSON { "pcm_base64": "...", "sample_rate": 48000, "dtype": "s16" }
+      sample_rate must be 8000–192000 Hz.
+    Options (form/JSON field or query string):
+      timeline: true -> score the whole recording in overlapping 3 s windows
+      quality:  fast | balanced | best (default: service-config.json);
+                fast = energy heuristic, no model (ignored with timeline)
+    Returns: { emotion, confidence, source, timings[, distribution, duration_sec, timeline] }
     """
     try:
-        tmp_path = None
-
-        if request.content_type and "multipart" in request.content_type:
+        # Audio stays in memory; ml.audio_io only spools to disk for
+        # containers libsndfile cannot decode (e.g. webm).
+        sample_rate = None
+        if request.mimetype == "application/octet-stream":
+            from ml.audio_io import decode_pcm
+            options = request.args
+            fmt = "pcm"
+            if (request.content_length or 0) > MAX_AUDIO_BYTES:
+                return response_error("Audio too large", 413, f"Max {MAX_AUDIO_BYTES} bytes")
+            try:
+                audio_bytes = decode_pcm(request.get_data(), dtype=options.get("dtype", "s16"))
+                sample_rate = _sample_rate(options.get("sample_rate", 22050))
+            except ValueError as exc:
+                return response_error("Invalid PCM audio", 400, str(exc))
+            if not len(audio_bytes):
+                return response_error("No audio data provided", 400)
+        elif request.content_type and "multipart" in request.content_type:
             audio_file = request.files.get("audio")
             if not audio_file:
                 return response_error("No audio file uploaded", 400)
-            suffix = os.path.splitext(audio_file.filename or ".wav")[1] or ".wav"
-            with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-                audio_file.save(tmp.name)
-                tmp_path = tmp.name
+            fmt = _audio_format(audio_file.filename)
+            audio_bytes = _read_audio_capped(audio_file)
+            options = request.form
         else:
             data = request.get_json(silent=True) or {}
-            b64  = data.get("audio_base64")
+            b64  = data.get("audio_base64") or data.get("pcm_base64")
             if not b64:
                 return response_error("No audio data provided. Use multipart 'audio' field or JSON 'audio_base64'.", 400)
+            if len(b64) > MAX_AUDIO_BYTES * 4 // 3 + _BASE64_SLACK:
+                return response_error("Audio too large", 413, f"Max {MAX_AUDIO_BYTES} bytes")
             import base64 as b64mod
             fmt  = data.get("format", "wav").lstrip(".")
             audio_bytes = b64mod.b64decode(b64)
-            with tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False) as tmp:
-                tmp.write(audio_bytes)
-                tmp_path = tmp.name
+            options = data
+            if data.get("pcm_base64"):
+                from ml.audio_io import decode_pcm
+                fmt = "pcm"
+                try:
+                    audio_bytes = decode_pcm(audio_bytes, dtype=str(data.get("dtype", "s16")))
+                    sample_rate = _sample_rate(data.get("sample_rate", 22050))
+                except ValueError as exc:
+                    return response_error("Invalid PCM audio", 400, str(exc))
 
         get_voice_analyzer()  # trigger load
         analyzer_full = _voice_analyzer_full
@@ -375,8 +793,15 @@ def detect_voice():
             return response_error("Voice analysis unavailable", 503,
                                   _voice_import_error or "voice analyzer failed to initialize")
 
+        timeline = str(options.get("timeline") or request.args.get("timeline") or "").lower() in ("1", "true", "yes")
+        quality  = _quality("detect-voice", options)
+
         start_t = time.perf_counter()
-        result = analyzer_full(tmp_path)
+        if timeline:
+            from ml.voice_emotion import analyze_voice_timeline
+            result = analyze_voice_timeline(audio_bytes, fmt=fmt, sample_rate=sample_rate)
+        else:
+            result = analyzer_full(audio_bytes, fmt=fmt, sample_rate=sample_rate, quality=quality)
         inference_ms = round((time.perf_counter() - start_t) * 1000, 2)
 
         logger.info(
@@ -390,44 +815,141 @@ def detect_voice():
             "emotion":   result["emotion"],
             "confidence": result["confidence"],
             "source":    result["source"],
+            "quality":   quality,
             "inference_ms": inference_ms,
         })
         return response_ok({
             "emotion":    result["emotion"],
             "confidence": result["confidence"],
             "source":     result["source"],
+            "quality":    quality,
             "inference_ms": inference_ms,
+            "timings":    result.get("timings"),
+            **({k: result.get(k) for k in ("distribution", "duration_sec", "timeline")} if timeline else {}),
         })
 
+    except AudioTooLarge as exc:
+        return response_error("Audio too large", 413, str(exc))
+    except VoicePoolBusy as exc:
+        return response_error("Voice analysis busy", 503, str(exc))
+    except InvalidQuality as exc:
+        return response_error("Invalid quality", 400, str(exc))
     except Exception as exc:
         logger.exception("detect-voice failure")
         return response_error("Voice analysis failed", 500, str(exc))
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
+
+
+@app.route("/detect-voice/stream", methods=["POST", "DELETE"])
+def detect_voice_stream():
+    """
+    Live voice emotion from PCM chunks sent as they are captured.
+    POST ?session_id=<id>&sample_rate=22050&dtype=s16|f32&final=1
+         body: raw little-endian mono PCM (application/octet-stream), or
+         { "pcm_base64": "...", "session_id", "sample_rate", "dtype", "final" }
+         Omit session_id on the first chunk; reuse the returned one after.
+         Ids are issued by the server: an unknown or expired session_id
+         starts a new session, so always continue with the returned id.
+         sample_rate (8000–192000) is fixed by the first chunk; a later
+         chunk that sends a different one is rejected.
+         A provisional emotion is returned once per 3 s of audio; final=1
+         flushes the stream and returns the final emotion.
+    DELETE ?session_id=<id> ends the session.
+    Returns: { session_id, emotion, confidence, distribution, source,
+               provisional, final, duration_sec, windows, timings }
+    """
+    try:
+        from ml.audio_io import decode_pcm
+        from ml.voice_stream import voice_streams
+
+        if request.method == "DELETE":
+            closed = voice_streams.close(request.args.get("session_id", ""))
+            if closed is None:
+                return response_error("Unknown stream session", 404)
+            return response_ok({"closed": closed})
+
+        if (request.content_length or 0) > MAX_AUDIO_CHUNK_BYTES * 4 // 3 + _BASE64_SLACK:
+            return response_error("Audio chunk too large", 413, f"Max {MAX_AUDIO_CHUNK_BYTES} bytes")
+        if request.mimetype == "application/octet-stream":
+            data  = {}
+            chunk = request.get_data()
+        else:
+            import base64 as b64mod
+            data  = request.get_json(silent=True) or {}
+            chunk = b64mod.b64decode(data.get("pcm_base64") or "")
+        if len(chunk) > MAX_AUDIO_CHUNK_BYTES:
+            return response_error("Audio chunk too large", 413, f"Max {MAX_AUDIO_CHUNK_BYTES} bytes")
+
+        def option(name, default=None):
+            return request.args.get(name) or data.get(name) or default
+
+        final = str(option("final", "")).lower() in ("1", "true", "yes")
+        if not chunk and not final:
+            return response_error("No audio data provided", 400)
+        if get_voice_analyzer() is None:
+            return response_error("Voice analysis unavailable", 503,
+                                  _voice_import_error or "voice analyzer failed to initialize")
+
+        # Explicit None checks: a JSON 0 must be rejected, not read as "unset".
+        sent_rate = request.args.get("sample_rate")
+        if sent_rate is None:
+            sent_rate = data.get("sample_rate")
+        try:
+            pcm = decode_pcm(chunk, dtype=str(option("dtype", "s16")))
+            sample_rate = _sample_rate(22050 if sent_rate is None else sent_rate)
+        except ValueError as exc:
+            return response_error("Invalid PCM chunk", 400, str(exc))
+
+        stream = voice_streams.get_or_create(option("session_id"), sample_rate=sample_rate)
+        if sent_rate is not None and sample_rate != stream.sample_rate:
+            return response_error("Sample rate changed", 400,
+                                  f"Session streams at {stream.sample_rate} Hz; send every chunk at that rate")
+        start_t = time.perf_counter()
+        try:
+            result = stream.push(pcm, final=final)
+        except ValueError as exc:
+            return response_error("Stream already finished", 409, str(exc))
+        inference_ms = round((time.perf_counter() - start_t) * 1000, 2)
+
+        if final:
+            voice_streams.close(stream.session_id)
+            _log_prediction({
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "endpoint":  "detect-voice-stream",
+                "emotion":   result["emotion"],
+                "confidence": result["confidence"],
+                "source":    result["source"],
+                "inference_ms": inference_ms,
+            })
+        return response_ok({"session_id": stream.session_id, **result, "inference_ms": inference_ms})
+    except VoicePoolBusy as exc:
+        return response_error("Voice analysis busy", 503, str(exc))
+    except Exception as exc:
+        logger.exception("detect-voice stream failure")
+        return response_error("Voice stream analysis failed", 500, str(exc))
 
 
 @app.route("/detect-text", methods=["POST"])
 def detect_text():
     """
     Detect emotion from text.
-    Body: { "text": "I feel amazing today!" }
-    Returns: { emotion, confidence, source }
+    Body: { "text": "I feel amazing today!", "quality": "fast|balanced|best" (optional) }
+    Returns: { emotion, confidence, source, quality }
     """
     try:
         data = request.get_json(silent=True) or {}
         text = str(data.get("text") or "").strip()
         if not text:
             return response_error("No text provided", 400)
+        quality = _quality("detect-text", data)
 
         get_text_analyzer()  # trigger load
         analyzer_full = _text_analyzer_full
         if analyzer_full is None:
             mood = _simple_text_fallback(text)
-            return response_ok({"emotion": mood, "confidence": 0.4, "source": "fallback"})
+            return response_ok({"emotion": mood, "confidence": 0.4, "source": "fallback", "quality": quality})
 
         start_t = time.perf_counter()
-        result = analyzer_full(text)
+        result = analyzer_full(text, quality=quality)
         inference_ms = round((time.perf_counter() - start_t) * 1000, 2)
 
         logger.info(
@@ -441,49 +963,125 @@ def detect_text():
             "emotion":   result["emotion"],
             "confidence": result["confidence"],
             "source":    result["source"],
+            "quality":   quality,
             "inference_ms": inference_ms,
+            **({"text": text[:LOG_TEXT_MAX]} if LOG_TEXT else {}),
         })
         return response_ok({
             "emotion":    result["emotion"],
             "confidence": result["confidence"],
             "source":     result["source"],
+            "quality":    quality,
             "inference_ms": inference_ms,
+            **({"chunks": result["chunks"]} if "chunks" in result else {}),
         })
+    except InvalidQuality as exc:
+        return response_error("Invalid quality", 400, str(exc))
     except Exception as exc:
         logger.exception("detect-text failure")
         return response_error("Text analysis failed", 500, str(exc))
 
 
+@app.route("/detect-text-batch", methods=["POST"])
+def detect_text_batch():
+    """
+    Detect emotion for many texts in one call (vectorised model inference).
+    Body: { "texts": ["I feel amazing today!", "so alone lately", ...],  (≤ MAX_TEXT_BATCH)
+            "quality": "fast|balanced|best" (optional) }
+    Returns: { results: [{ emotion, confidence, source[, chunks] }], count, quality, inference_ms }
+             results are in request order.
+    """
+    try:
+        data  = request.get_json(silent=True) or {}
+        texts = data.get("texts")
+        if not isinstance(texts, list) or not texts:
+            return response_error("No texts provided", 400, "Body must be { \"texts\": [..] }")
+        if len(texts) > MAX_TEXT_BATCH:
+            return response_error("Too many texts", 413, f"Max {MAX_TEXT_BATCH} per request")
+        texts   = [str(t or "").strip() for t in texts]
+        quality = _quality("detect-text-batch", data)
+
+        get_text_analyzer()  # trigger load
+        start_t = time.perf_counter()
+        if _text_analyzer_full is None:
+            results = [{"emotion": _simple_text_fallback(t), "confidence": 0.4, "source": "fallback"} for t in texts]
+        else:
+            from ml.text_emotion import analyze_text_emotion_batch
+            results = analyze_text_emotion_batch(texts, quality=quality)
+        inference_ms = round((time.perf_counter() - start_t) * 1000, 2)
+
+        logger.info("[detect-text-batch] count=%d inference_ms=%.2f", len(texts), inference_ms)
+
+        # One entry per text for the emotion counts, but no inference_ms: an
+        # averaged share of the batch is not a request latency, so these
+        # entries stay out of the latency rollups (the batch time is logged above).
+        timestamp = datetime.utcnow().isoformat() + "Z"
+        for text, result in zip(texts, results):
+            _log_prediction({
+                "timestamp": timestamp,
+                "endpoint":  "detect-text-batch",
+                "emotion":   result["emotion"],
+                "confidence": result["confidence"],
+                "source":    result["source"],
+                "quality":   quality,
+                "batch_size": len(texts),
+                **({"text": text[:LOG_TEXT_MAX]} if LOG_TEXT else {}),
+            })
+        return response_ok({"results": results, "count": len(results), "quality": quality,
+                            "inference_ms": inference_ms})
+    except InvalidQuality as exc:
+        return response_error("Invalid quality", 400, str(exc))
+    except Exception as exc:
+        logger.exception("detect-text-batch failure")
+        return response_error("Text batch analysis failed", 500, str(exc))
+
+
 @app.route("/detect-multimodal", methods=["POST"])
 def detect_multimodal():
     """
     Fuse emotion from any combination of face + voice + text.
     Body (JSON or multipart):
-      - image:       base64 image string  (optional)
+      - image:       base64 image string or multipart file (optional)
       - text:        plain text           (optional)
       - audio_base64: base64 audio        (optional)
+      - quality:     fast | balanced | best, applied to every modality (optional)
+    A raw image body (application/octet-stream / image/*) is also accepted,
+    with text in the query string.
     Weights: face 40%, voice 30%, text 30%
     Returns: { emotion, confidence, votes, sources, modalities: {face, voice, text} }
     """
-    tmp_path = None
     try:
         from ml.fusion import fuse_emotions_weighted, _result_to_probs
 
-        # Parse request (supports both JSON and multipart)
-        if request.content_type and "multipart" in request.content_type:
-            image_data  = request.form.get("image")
+        # Parse request (supports JSON, multipart, or a raw image body)
+        if _is_raw_image_request():
+            image_data  = _image_from_request()
+            text        = request.args.get("text", "")
+            audio_file  = None
+            audio_b64   = None
+            options     = request.args
+        elif request.content_type and "multipart" in request.content_type:
+            image_data  = _image_from_request()
             text        = request.form.get("text", "")
             audio_file  = request.files.get("audio")
             audio_b64   = None
+            options     = request.form
         else:
             data       = request.get_json(silent=True) or {}
-            image_data = data.get("image")
+            image_data = _image_from_request(data)
             text       = str(data.get("text") or "")
             audio_b64  = data.get("audio_base64")
             audio_file = None
+            options    = data
+        quality = _quality("detect-multimodal", options)
 
         if not any([image_data, text.strip(), audio_b64, audio_file]):
             return response_error("Provide at least one of: image, text, audio", 400)
+        # Size-check the audio before any modality runs.
+        if audio_file:
+            audio_bytes = _read_audio_capped(audio_file)
+        elif audio_b64 and len(audio_b64) > MAX_AUDIO_BYTES * 4 // 3 + _BASE64_SLACK:
+            raise AudioTooLarge(f"Audio exceeds {MAX_AUDIO_BYTES} bytes")
 
         face_result  = None
         voice_result = None
@@ -494,7 +1092,7 @@ def detect_multimodal():
             get_face_analyzer()
             if _face_analyzer_full:
                 try:
-                    face_result = _face_analyzer_full(image_data)
+                    face_result = _face_analyzer_full(image_data, quality=quality)
                 except Exception as e:
                     logger.warning("Face modality failed: %s", e)
 
@@ -505,16 +1103,13 @@ def detect_multimodal():
                 try:
                     import base64 as b64mod
                     if audio_file:
-                        suffix = os.path.splitext(audio_file.filename or ".wav")[1] or ".wav"
-                        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-                            audio_file.save(tmp.name)
-                            tmp_path = tmp.name
+                        fmt = _audio_format(audio_file.filename)
                     else:
                         fmt = "wav"
-                        with tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False) as tmp:
-                            tmp.write(b64mod.b64decode(audio_b64))
-                            tmp_path = tmp.name
-                    voice_result = _voice_analyzer_full(tmp_path)
+                        audio_bytes = b64mod.b64decode(audio_b64)
+                    voice_result = _voice_analyzer_full(audio_bytes, fmt=fmt, quality=quality)
+                    if voice_result.get("source") == "no_speech":
+                        voice_result = None  # silence carries no vote
                 except Exception as e:
                     logger.warning("Voice modality failed: %s", e)
 
@@ -523,7 +1118,7 @@ def detect_multimodal():
             get_text_analyzer()
             if _text_analyzer_full:
                 try:
-                    text_result = _text_analyzer_full(text)
+                    text_result = _text_analyzer_full(text, quality=quality)
                 except Exception as e:
                     logger.warning("Text modality failed: %s", e)
             else:
@@ -554,6 +1149,7 @@ def detect_multimodal():
             "confidence":   fusion["confidence"],
             "fusion_method": fusion.get("fusion_method", "weighted"),
             "sources":      fusion["sources"],
+            "quality":      quality,
             "inference_ms": inference_ms,
             "face_probs":   _result_to_probs(face_result)  if face_result  else None,
             "voice_probs":  _result_to_probs(voice_result) if voice_result else None,
@@ -566,6 +1162,7 @@ def detect_multimodal():
             "votes":         fusion["votes"],
             "sources":       fusion["sources"],
             "fusion_method": fusion.get("fusion_method", "weighted"),
+            "quality":       quality,
             "inference_ms": inference_ms,
             "breakdown": {
                 "face":  {"emotion": face_result["emotion"],  "confidence": face_result["confidence"],  "source": face_result.get("source")}  if face_result  else None,
@@ -579,12 +1176,15 @@ def detect_multimodal():
             },
         })
 
+    except AudioTooLarge as exc:
+        return response_error("Audio too large", 413, str(exc))
+    except ImageTooLarge as exc:
+        return response_error("Image too large", 413, str(exc))
+    except InvalidQuality as exc:
+        return response_error("Invalid quality", 400, str(exc))
     except Exception as exc:
         logger.exception("detect-multimodal failure")
         return response_error("Multimodal analysis failed", 500, str(exc))
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
 
 
 @app.route("/recommend", methods=["GET"])
@@ -650,8 +1250,14 @@ if __name__ == "__main__":
 
     # Preload models once at startup so requests do not repeatedly trigger lazy imports.
     face_ok = get_face_analyzer() is not None
+    if face_ok:
+        from ml.face_emotion import warm_up as warm_up_face
+        warm_up_face()
     text_ok = get_text_analyzer() is not None
     voice_ok = get_voice_analyzer() is not None
+    if voice_ok:
+        from ml.voice_emotion import warm_up as warm_up_voice
+        warm_up_voice()
     logger.info(
         "Model preload complete | face=%s text=%s voice=%s",
         "ok" if face_ok else "unavailable",
@@ -0,0 +1,147 @@
+"""
+Audio decoding for the voice endpoints.
+
+load_audio() accepts whatever the API has in hand — a file path, raw
+bytes, a file-like object (BytesIO / upload stream) or a numpy array — and
+returns a mono float32 waveform at the requested sample rate.
+
+WAV / FLAC / OGG (anything libsndfile reads) is decoded straight from
+memory. Only containers libsndfile cannot parse (webm, m4a, ...) are
+spooled to a temporary file for librosa's audioread/ffmpeg backend.
+
+Raw PCM (decode_pcm) skips container decoding entirely. Audio already at
+the target rate is not resampled. Other rates go straight to soxr's HQ
+polyphase resampler, the same one librosa.resample uses by default, minus
+librosa's dispatch overhead. StreamResampler keeps the filter state
+between chunks, so chunked input resamples without seams.
+"""
+
+import io
+import os
+import tempfile
+import time
+import numpy as np
+from ml.timing import elapsed_ms
+
+DEFAULT_SR = 22050
+
+# Raw PCM sample formats accepted by decode_pcm().
+PCM_DTYPES = {"s16": ("<i2", 1 / 32768.0), "f32": ("<f4", 1.0)}
+
+
+def _to_mono(y: np.ndarray) -> np.ndarray:
+    if y.ndim > 1:
+        y = y.mean(axis=1)
+    return np.ascontiguousarray(y, dtype=np.float32)
+
+
+def _resample(y: np.ndarray, orig_sr: int, sr: int | None) -> np.ndarray:
+    if sr is None or orig_sr == sr:
+        return y
+    try:
+        import soxr
+    except ImportError:
+        import librosa
+        return librosa.resample(y, orig_sr=orig_sr, target_sr=sr)
+    return soxr.resample(y, orig_sr, sr, quality="HQ").astype(np.float32, copy=False)
+
+
+class StreamResampler:
+    """Chunk-by-chunk resampling that carries filter state across calls."""
+
+    def __init__(self, orig_sr: int, sr: int = DEFAULT_SR):
+        import soxr
+        self.orig_sr = orig_sr
+        self.sr      = sr
+        self._stream = soxr.ResampleStream(orig_sr, sr, 1, dtype="float32", quality="HQ")
+
+    def process(self, y: np.ndarray, last: bool = False) -> np.ndarray:
+        return self._stream.resample_chunk(np.asarray(y, dtype=np.float32), last=last)
+
+
+def decode_pcm(data: bytes, dtype: str = "s16", channels: int = 1) -> np.ndarray:
+    """Interleaved little-endian PCM ("s16" | "f32") -> mono float32 in [-1, 1]."""
+    if dtype not in PCM_DTYPES:
+        raise ValueError(f"Unsupported PCM dtype {dtype!r} (expected one of {', '.join(PCM_DTYPES)})")
+    np_dtype, scale = PCM_DTYPES[dtype]
+    width = np.dtype(np_dtype).itemsize * channels
+    y = np.frombuffer(data[: len(data) - len(data) % width], dtype=np_dtype)
+    if channels > 1:
+        y = y.reshape(-1, channels)
+    return _to_mono(y * scale if scale != 1.0 else y)
+
+
+def _read_soundfile(buf, sr, duration, timings):
+    import soundfile as sf
+    start = time.perf_counter()
+    with sf.SoundFile(buf) as f:
+        frames = -1 if duration is None else int(duration * f.samplerate)
+        y = f.read(frames=frames, dtype="float32", always_2d=False)
+        orig_sr = f.samplerate
+    y = _to_mono(y)
+    timings["decode_ms"] = elapsed_ms(start)
+    start = time.perf_counter()
+    y = _resample(y, orig_sr, sr)
+    timings["resample_ms"] = elapsed_ms(start)
+    return y, (sr or orig_sr)
+
+
+def _read_via_tempfile(data: bytes, sr, duration, fmt):
+    import librosa
+    suffix = f".{(fmt or 'wav').lstrip('.')}"
+    tmp_path = None
+    try:
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+            tmp.write(data)
+            tmp_path = tmp.name
+        return librosa.load(tmp_path, sr=sr, duration=duration)
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def load_audio(source, sr: int | None = DEFAULT_SR, duration: float | None = None,
+               fmt: str | None = None, source_sr: int | None = None,
+               timings: dict | None = None):
+    """
+    Decode `source` to (mono float32 waveform, sample rate).
+
+    source:    path | bytes | file-like | np.ndarray
+    sr:        target rate (None keeps the native rate)
+    duration:  seconds to read from the start (None = everything)
+    fmt:       container hint ("wav", "webm", ...) for the tempfile fallback
+    source_sr: sample rate of a numpy `source` (defaults to `sr`)
+    timings:   optional dict that receives decode_ms / resample_ms
+    """
+    timings = {} if timings is None else timings
+
+    if isinstance(source, np.ndarray):
+        orig_sr = source_sr or sr or DEFAULT_SR
+        y = _to_mono(source)
+        if duration is not None:
+            y = y[: int(duration * orig_sr)]
+        start = time.perf_counter()
+        y = _resample(y, orig_sr, sr)
+        timings["resample_ms"] = elapsed_ms(start)
+        return y, (sr or orig_sr)
+
+    if isinstance(source, (str, os.PathLike)):
+        import librosa
+        start = time.perf_counter()
+        result = librosa.load(source, sr=sr, duration=duration)
+        timings["decode_ms"] = elapsed_ms(start)
+        return result
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        data = bytes(source)
+    else:
+        data = source.read()
+
+    try:
+        return _read_soundfile(io.BytesIO(data), sr, duration, timings)
+    except Exception:
+        # Not a libsndfile format (e.g. browser webm/opus): external decoder.
+        start = time.perf_counter()
+        result = _read_via_tempfile(data, sr, duration, fmt)
+        timings["decode_ms"] = elapsed_ms(start)
+        return result
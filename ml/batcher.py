@@ -0,0 +1,140 @@
+"""
+Cross-request micro-batching.
+
+A MicroBatcher sits in front of a model: request threads submit single
+items and block on a future, while one worker thread gathers items for up
+to `max_wait_ms` (or until `max_batch` are queued), runs one batched call
+and fans the results back out. A failed batch fails only its own items,
+all with one shared exception. Batch-size histograms and queue metrics
+are kept per batcher and exported through batcher_stats().
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+class MicroBatcher:
+    def __init__(self, name: str, run_batch, max_batch: int = 16, max_wait_ms: float = 5.0,
+                 max_queue: int = 1024):
+        """
+        `run_batch(items) -> results` must return one result per item, in order.
+        """
+        self.name        = name
+        self.run_batch   = run_batch
+        self.max_batch   = max(1, int(max_batch))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self._queue      = queue.Queue(maxsize=max_queue)
+        self._thread     = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.batches      = 0
+        self.items        = 0
+        self.errors       = 0
+        self.histogram    = {}
+        self.wait_ms_sum  = 0.0
+        self.run_ms_sum   = 0.0
+
+        with _batchers_lock:
+            _batchers[name] = self
+
+    def submit(self, item, timeout: float | None = 30.0):
+        """Queue one item and wait for its result (re-raises batch errors)."""
+        return self.submit_async(item).result(timeout)
+
+    def submit_many(self, items: list, timeout: float | None = 30.0) -> list:
+        """Queue several items at once; they may share a batch with other callers."""
+        futures = [self.submit_async(item) for item in items]
+        return [f.result(timeout) for f in futures]
+
+    def submit_async(self, item) -> Future:
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            batches = self.batches or 1
+            return {
+                "max_batch":      self.max_batch,
+                "max_wait_ms":    self.max_wait_ms,
+                "queue_depth":    self._queue.qsize(),
+                "batches":        self.batches,
+                "items":          self.items,
+                "errors":         self.errors,
+                "avg_batch_size": round(self.items / batches, 2),
+                "avg_wait_ms":    round(self.wait_ms_sum / max(self.items, 1), 2),
+                "avg_run_ms":     round(self.run_ms_sum / batches, 2),
+                "batch_size_histogram": dict(sorted(self.histogram.items())),
+            }
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"batcher-{self.name}", daemon=True,
+                )
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            items = [item for item, _, _ in batch]
+            try:
+                results = self.run_batch(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"{self.name}: run_batch returned {len(results)} results for {len(items)} items"
+                    )
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+                failed = False
+            except BaseException as e:
+                # Fail only this batch and keep the worker alive; every caller
+                # gets the same exception object, so a circuit breaker in
+                # front of submit() counts the batch as one failure.
+                if not isinstance(e, Exception):
+                    e = RuntimeError(f"{self.name}: batch aborted ({type(e).__name__})")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                failed = True
+            run_ms = (time.perf_counter() - started) * 1000
+
+            with self._stats_lock:
+                self.batches += 1
+                self.items   += len(batch)
+                self.errors  += int(failed)
+                self.histogram[len(batch)] = self.histogram.get(len(batch), 0) + 1
+                self.wait_ms_sum += sum((started - queued) * 1000 for _, _, queued in batch)
+                self.run_ms_sum  += run_ms
+
+
+def batcher_stats() -> dict:
+    """Stats for every batcher created in this process."""
+    with _batchers_lock:
+        batchers = dict(_batchers)
+    return {name: b.stats() for name, b in batchers.items()}
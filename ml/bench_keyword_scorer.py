@@ -0,0 +1,177 @@
+"""
+Parity check and benchmark for ml.keyword_scorer.
+
+Compares the single-pass scorer against the pre-refactor implementations
+(per-call pattern dict + ~25 re.findall scans for the mood heuristic, 9
+scans for the loneliness cues, and the substring-scan quick fallback) on
+generated texts of increasing length, then times both.
+
+Usage:
+  python -m ml.bench_keyword_scorer
+  python -m ml.bench_keyword_scorer -n 500 --words 5000
+
+The mood heuristic and loneliness counts must agree exactly (exit 1
+otherwise). The quick fallback now matches whole words instead of
+substrings ("made" no longer reads as "mad"), so its agreement is only
+reported.
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from ml.keyword_scorer import LONELY_TERMS, MOOD_TERMS, QUICK_TERMS, score_text
+
+
+# ── Pre-refactor reference implementations ────────────────────────────────────
+def reference_simple(text):
+    import re
+    text_lower = text.lower()
+    emotion_patterns = {
+        "Happy":   [
+            (r'\b(happy|joy|joyful|delighted|cheerful|wonderful|amazing|fantastic|great|awesome|love|loved|loving|grateful|bliss)\b', 2),
+            (r'\b(good|nice|pleasant|lovely|enjoy|glad|pleased)\b', 1),
+            (r'(😊|😄|😃|🙂|😁|🥰|❤️|💕)', 2),
+        ],
+        "Sad": [
+            (r'\b(sad|depressed|unhappy|miserable|upset|down|heartbroken|crying|cry|tears|grief|sorrow|hopeless)\b', 2),
+            (r'\b(disappointed|pessimistic|gloomy|despair|broken)\b', 1),
+            (r'(😢|😭|😔|☹️|😞)', 2),
+        ],
+        "Angry": [
+            (r'\b(angry|mad|furious|rage|outraged|irritated|annoyed|frustrated|hate|hatred|disgust)\b', 2),
+            (r'\b(pissed|aggravated|bitter|resentful)\b', 1),
+            (r'(😠|😡|🤬|😤)', 2),
+        ],
+        "Anxious": [
+            (r'\b(anxious|worried|nervous|panic|fear|scared|afraid|terrified|uneasy|apprehensive)\b', 2),
+            (r'\b(uncertain|concerned|dread|phobia)\b', 1),
+            (r'(😰|😨|😱|😟|😧)', 2),
+        ],
+        "Stressed": [
+            (r'\b(stressed|overwhelmed|pressure|burnout|tense|overloaded|deadline|exhausting|chaotic)\b', 2),
+            (r'\b(swamped|buried|frantic|hectic)\b', 1),
+        ],
+        "Lonely": [
+            (r'\b(lonely|alone|isolated|miss|abandoned|disconnected|left out|no one|nobody)\b', 2),
+            (r'\b(forgotten|invisible|unwanted)\b', 1),
+        ],
+        "Tired": [
+            (r'\b(tired|exhausted|sleepy|fatigued|drained|bored|boring|monoton|lethargic|weary|burnt out)\b', 2),
+            (r'\b(numb|flat|meh|blah|sluggish)\b', 1),
+        ],
+        "Excited": [
+            (r'\b(excited|thrilled|enthusiastic|eager|pumped|energized|motivated|hyped|stoked)\b', 2),
+            (r'\b(can.t wait|looking forward|incredible|unbelievable)\b', 1),
+            (r'(🎉|🎊|🥳|🤩|✨)', 2),
+        ],
+        "Calm": [
+            (r'\b(calm|peaceful|relaxed|serene|tranquil|content|satisfied|comfortable|okay|fine|alright|steady)\b', 2),
+            (r'(😌|🙏|🧘)', 2),
+        ],
+        "Neutral": [
+            (r'\b(neutral|normal|nothing|just|whatever|idk|hmm|so so|meh)\b', 1),
+        ],
+    }
+    scores = {e: 0 for e in emotion_patterns}
+    for emotion, patterns in emotion_patterns.items():
+        for pattern, weight in patterns:
+            scores[emotion] += len(re.findall(pattern, text_lower)) * weight
+    if max(scores.values()) == 0:
+        return "Neutral"
+    return max(scores, key=scores.get)
+
+
+def reference_lonely(text):
+    import re
+    patterns = [r"\blonely\b", r"\balone\b", r"\bisolated\b", r"\bno one\b", r"\bnobody\b",
+                r"\bleft out\b", r"\bdisconnected\b", r"\bfeel unseen\b", r"\babandoned\b"]
+    text_lower = text.lower()
+    return sum(len(re.findall(p, text_lower)) for p in patterns)
+
+
+def reference_quick(text):
+    text_lower = text.lower()
+    if any(w in text_lower for w in ["happy", "great", "good", "awesome", "joy", "excited", "wonderful"]):
+        return "Happy"
+    if any(w in text_lower for w in ["sad", "down", "depressed", "cry", "upset", "lonely"]):
+        return "Sad"
+    if any(w in text_lower for w in ["angry", "mad", "furious", "annoyed", "rage"]):
+        return "Angry"
+    if any(w in text_lower for w in ["anxious", "worried", "stress", "nervous", "panic", "fear"]):
+        return "Anxious"
+    if any(w in text_lower for w in ["excited", "thrilled", "amazing", "fantastic"]):
+        return "Excited"
+    return "Calm"
+
+
+# ── New call-site equivalents ─────────────────────────────────────────────────
+def new_simple(text):
+    moods = score_text(text)["moods"]
+    return "Neutral" if max(moods.values()) == 0 else max(moods, key=moods.get)
+
+
+def new_quick(text):
+    quick = score_text(text)["quick"]
+    return next((mood for mood, hits in quick.items() if hits), "Calm")
+
+
+_FILLER = ("i the a today was and then my work felt like it is really so very wait can't "
+           "don't know why everything").split()
+
+
+def _vocabulary():
+    terms = set(LONELY_TERMS)
+    for groups in MOOD_TERMS.values():
+        for _, spec in groups:
+            terms.update(spec.split() if isinstance(spec, str) else spec)
+    for spec in QUICK_TERMS.values():
+        terms.update(spec.split())
+    terms.discard("can.t wait")
+    return sorted(terms | {"can't wait", "feel unseen"})
+
+
+def _texts(n, words, rng):
+    vocab = _vocabulary()
+    for _ in range(n):
+        tokens = [rng.choice(vocab) if rng.random() < 0.15 else rng.choice(_FILLER) for _ in range(words)]
+        text = " ".join(tokens)
+        yield text.upper() if rng.random() < 0.1 else text
+
+
+def _time(fn, texts, reps):
+    start = time.perf_counter()
+    for _ in range(reps):
+        for t in texts:
+            fn(t)
+    return (time.perf_counter() - start) * 1000 / (reps * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=300, help="texts per length")
+    parser.add_argument("--words", type=int, nargs="*", default=[10, 100, 1000, 10000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failures = 0
+    for words in args.words:
+        texts = list(_texts(max(3, args.n * 10 // max(words, 10)), words, rng))
+        simple_bad = sum(reference_simple(t) != new_simple(t) for t in texts)
+        lonely_bad = sum(reference_lonely(t) != score_text(t)["lonely_hits"] for t in texts)
+        quick_same = sum(reference_quick(t) == new_quick(t) for t in texts)
+        failures += simple_bad + lonely_bad
+
+        reps = max(1, 2000 // (len(texts) * max(1, words // 100)))
+        old_ms = _time(lambda t: (reference_simple(t), reference_lonely(t), reference_quick(t)), texts, reps)
+        new_ms = _time(score_text, texts, reps)
+        print(f"{words:>6} words x {len(texts):>4}: mood mismatches {simple_bad}, lonely mismatches {lonely_bad}, "
+              f"quick agreement {quick_same / len(texts):.0%} | "
+              f"old 3 scorers {old_ms:.3f} ms, single pass {new_ms:.3f} ms ({old_ms / new_ms:.1f}x)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
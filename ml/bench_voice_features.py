@@ -0,0 +1,112 @@
+"""
+Parity check and benchmark for the single-STFT voice front-end.
+
+Compares ml.voice_features.feature_vector against the original
+four-STFT librosa implementation on 3 s clips and times both.
+
+Usage:
+  python -m ml.bench_voice_features                  # synthetic clips
+  python -m ml.bench_voice_features --audio DIR      # wav/flac/ogg files
+  python -m ml.bench_voice_features -n 50 --rtol 1e-4
+
+Exits non-zero if any clip differs beyond tolerance or the voice model
+predicts a different label from the two feature vectors.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+from ml.voice_features import HOP_LEN, N_MELS, N_MFCC, SR, feature_vector, warm_up
+
+
+def reference_features(y: np.ndarray, sr: int = SR) -> np.ndarray:
+    """The pre-refactor _extract_features body (one STFT per librosa call)."""
+    import librosa
+    mfcc     = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=N_MFCC, hop_length=HOP_LEN)
+    mfcc_f   = np.concatenate([mfcc.mean(axis=1), mfcc.std(axis=1)])
+    chroma   = librosa.feature.chroma_stft(y=y, sr=sr, hop_length=HOP_LEN)
+    chroma_f = np.concatenate([chroma.mean(axis=1), chroma.std(axis=1)])
+    contrast = librosa.feature.spectral_contrast(y=y, sr=sr, hop_length=HOP_LEN)
+    cont_f   = np.concatenate([contrast.mean(axis=1), contrast.std(axis=1)])
+    mel      = librosa.feature.melspectrogram(y=y, sr=sr, n_mels=N_MELS, hop_length=HOP_LEN)
+    mel_f    = librosa.power_to_db(mel).mean(axis=1)
+    zcr      = librosa.feature.zero_crossing_rate(y, hop_length=HOP_LEN).mean()
+    rms      = librosa.feature.rms(y=y, hop_length=HOP_LEN).mean()
+    return np.concatenate([mfcc_f, chroma_f, cont_f, mel_f, [zcr, rms]])
+
+
+def _clips(audio_dir: str | None, n: int):
+    from ml.audio_io import load_audio
+
+    target = 3 * SR
+    if audio_dir:
+        paths = sorted(
+            p for ext in ("wav", "flac", "ogg")
+            for p in glob.glob(os.path.join(audio_dir, "**", f"*.{ext}"), recursive=True)
+        )[:n]
+        for path in paths:
+            y, _ = load_audio(path, sr=SR, duration=3.0)
+            yield os.path.basename(path), np.pad(y, (0, max(0, target - len(y))))[:target]
+        if paths:
+            return
+        print("⚠️  No audio files found — using synthetic clips")
+
+    rng = np.random.default_rng(0)
+    t = np.arange(target) / SR
+    for i in range(n):
+        f0 = rng.uniform(90, 300)
+        vibrato = 1 + 0.02 * np.sin(2 * np.pi * rng.uniform(3, 7) * t)
+        voiced = sum(np.sin(2 * np.pi * f0 * k * vibrato * t) / k for k in range(1, 6))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(0.5, 3) * t)
+        y = 0.2 * voiced * envelope + rng.uniform(0.001, 0.05) * rng.standard_normal(target)
+        yield f"synthetic-{i}", y.astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", help="directory of audio files")
+    parser.add_argument("-n", type=int, default=20, help="number of clips")
+    parser.add_argument("--rtol", type=float, default=1e-4)
+    parser.add_argument("--atol", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    from ml.voice_emotion import _load_model
+
+    payload = _load_model()
+    warm_up()
+    feature_vector(np.zeros(3 * SR, dtype=np.float32))  # first-call overhead out of the timings
+
+    ref_ms, new_ms, worst, failures = [], [], 0.0, 0
+    for name, y in _clips(args.audio, args.n):
+        t = time.perf_counter()
+        ref = reference_features(y)
+        ref_ms.append((time.perf_counter() - t) * 1000)
+        t = time.perf_counter()
+        new = feature_vector(y)
+        new_ms.append((time.perf_counter() - t) * 1000)
+
+        diff = float(np.max(np.abs(new - ref) / (np.abs(ref) + args.atol / args.rtol)))
+        worst = max(worst, diff)
+        same_label = True
+        if payload is not None:
+            model = payload["model"]
+            same_label = model.predict(ref.reshape(1, -1))[0] == model.predict(new.reshape(1, -1))[0]
+        ok = np.allclose(new, ref, rtol=args.rtol, atol=args.atol) and same_label
+        failures += int(not ok)
+        if not ok:
+            print(f"❌ {name}: max scaled diff {diff:.2e}, same label={same_label}")
+
+    speedup = np.median(ref_ms) / np.median(new_ms)
+    print(f"clips: {len(ref_ms)}  failures: {failures}  worst scaled diff: {worst:.2e}")
+    print(f"reference (4 STFTs): median {np.median(ref_ms):.1f} ms/clip")
+    print(f"shared front-end:    median {np.median(new_ms):.1f} ms/clip  ({speedup:.2f}x)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Circuit breakers for the model tiers of the text and face cascades.
+
+A tier that loaded but throws at inference time (a broken pipeline, a
+corrupt TFLite interpreter, DeepFace choking on its input) would otherwise
+be retried on every request, paying the exception and its latency before
+the next tier runs. Each tier's inference call goes through a
+CircuitBreaker instead:
+
+  - closed:    calls pass; the outcome of the last BREAKER_WINDOW calls is
+               kept, and once at least BREAKER_MIN_CALLS are recorded with a
+               failure rate ≥ BREAKER_FAILURE_RATE the breaker opens
+  - open:      calls are refused immediately (CircuitOpen) so the cascade
+               moves straight to the next tier, for BREAKER_COOLDOWN_SEC
+  - half-open: after the cool-down a single probe call is let through;
+               success closes the breaker, failure re-opens it
+
+Per-tier counters are exported through breaker_stats() (/health).
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+MIN_CALLS    = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+WINDOW       = int(os.getenv("BREAKER_WINDOW", "20"))
+COOLDOWN_SEC = float(os.getenv("BREAKER_COOLDOWN_SEC", "30"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitOpen(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_rate: float = FAILURE_RATE, min_calls: int = MIN_CALLS,
+                 window: int = WINDOW, cooldown_sec: float = COOLDOWN_SEC):
+        self.name         = name
+        self.failure_rate = failure_rate
+        self.min_calls    = max(1, min_calls)
+        self.cooldown_sec = cooldown_sec
+        self._outcomes    = deque(maxlen=max(self.min_calls, window))
+        self._lock        = threading.Lock()
+        self.state        = CLOSED
+        self._opened_at   = 0.0
+        self._probing     = False
+        self._last_exc    = None  # batch errors reach every caller as one object
+
+        self.successes       = 0
+        self.failures        = 0
+        self.short_circuited = 0
+        self.opened          = 0
+        self.ms_sum          = 0.0
+        self.last_error      = None
+
+        with _breakers_lock:
+            _breakers[name] = self
+
+    def call(self, fn, *args, **kwargs):
+        """fn(*args, **kwargs) through the breaker; raises CircuitOpen when refused."""
+        probe = self._allow()
+        if probe is None:
+            raise CircuitOpen(f"{self.name} circuit open")
+        start = time.perf_counter()
+        ok, error = False, None
+        try:
+            result = fn(*args, **kwargs)
+            ok = True
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # ok=False with no error: interrupted by a BaseException
+            # (KeyboardInterrupt, SystemExit, ...), which says nothing about the tier.
+            self._record(ok, start, error, probe)
+
+    def _allow(self):
+        """None when refused, else whether this call is the half-open probe."""
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_sec:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.short_circuited += 1
+            return None
+
+    def _record(self, ok: bool, start: float, error: Exception | None = None, probe: bool = False):
+        ms = (time.perf_counter() - start) * 1000
+        aborted = not ok and error is None
+        with self._lock:
+            if probe:
+                self._probing = False
+            if aborted:
+                return
+            if not ok and error is self._last_exc and not probe:
+                return  # same failed micro-batch, already counted
+            self.ms_sum += ms
+            if ok:
+                self.successes += 1
+            else:
+                self.failures  += 1
+                self.last_error = f"{type(error).__name__}: {error}"
+                self._last_exc  = error
+
+            # Only the probe decides a half-open breaker; calls admitted
+            # before it opened and finishing late do not.
+            if probe:
+                if ok:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._trip()
+                return
+            if self.state != CLOSED:
+                return
+            self._outcomes.append(ok)
+            if len(self._outcomes) >= self.min_calls:
+                failed = self._outcomes.count(False) / len(self._outcomes)
+                if failed >= self.failure_rate:
+                    self._trip()
+
+    def _trip(self):
+        self.state      = OPEN
+        self._opened_at = time.monotonic()
+        self.opened    += 1
+        self._outcomes.clear()
+        print(f"⚠️  {self.name}: circuit opened for {self.cooldown_sec:.0f}s ({self.last_error})")
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = self.successes + self.failures
+            return {
+                "state":           self.state,
+                "successes":       self.successes,
+                "failures":        self.failures,
+                "short_circuited": self.short_circuited,
+                "opened":          self.opened,
+                "window_failure_rate": round(self._outcomes.count(False) / max(len(self._outcomes), 1), 3),
+                "avg_ms":          round(self.ms_sum / max(calls, 1), 2),
+                "last_error":      self.last_error,
+            }
+
+
+def breaker_stats() -> dict:
+    """Stats for every breaker created in this process."""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {name: b.stats() for name, b in breakers.items()}
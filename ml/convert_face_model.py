@@ -0,0 +1,184 @@
+"""
+Convert ml/models/face_emotion_model.h5 into TFLite artifacts for the
+lightweight face inference path in ml.face_emotion.
+
+Usage:
+  python -m ml.convert_face_model                 # float32 .tflite
+  python -m ml.convert_face_model --int8          # + int8-quantized .tflite
+  python -m ml.convert_face_model --check         # parity vs Keras outputs
+  python -m ml.convert_face_model --bench         # load time / RSS / latency
+
+--samples DIR feeds real images (faces are detected and cropped exactly as
+in the API) to the int8 calibration, the parity check and the benchmark;
+without it random 48×48 crops are used.
+"""
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from ml.face_emotion import IMG_SIZE, MODEL_PATH, TFLITE_INT8_PATH, TFLITE_PATH
+
+RUNTIMES = {"keras": MODEL_PATH, "tflite": TFLITE_PATH, "tflite_int8": TFLITE_INT8_PATH}
+
+
+def sample_crops(samples_dir: str | None, limit: int = 200) -> np.ndarray:
+    """Preprocessed N×48×48×1 crops from images in samples_dir (or random)."""
+    import cv2
+    from ml.face_detect import detect_faces
+    from ml.face_emotion import _preprocess
+
+    crops = []
+    if samples_dir:
+        paths = sorted(
+            p for ext in ("jpg", "jpeg", "png", "bmp")
+            for p in glob.glob(os.path.join(samples_dir, "**", f"*.{ext}"), recursive=True)
+        )
+        for path in paths[:limit]:
+            gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if gray is None:
+                continue
+            faces, _ = detect_faces(gray)
+            x, y, w, h = faces[0] if faces else (0, 0, gray.shape[1], gray.shape[0])
+            crops.append(_preprocess(gray[y:y+h, x:x+w]))
+    if not crops:
+        print("⚠️  No sample images given/found — using random crops")
+        rng = np.random.default_rng(0)
+        crops = list(rng.random((limit, IMG_SIZE, IMG_SIZE, 1), dtype=np.float32))
+    return np.stack(crops).astype(np.float32)
+
+
+def convert(int8: bool, samples_dir: str | None):
+    import tensorflow as tf  # type: ignore
+
+    model = tf.keras.models.load_model(MODEL_PATH)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    with open(TFLITE_PATH, "wb") as f:
+        f.write(converter.convert())
+    print(f"✅ Wrote {TFLITE_PATH}")
+
+    if int8:
+        calib = sample_crops(samples_dir)
+
+        def representative():
+            for crop in calib:
+                yield [crop[np.newaxis, ...]]
+
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type  = tf.int8
+        converter.inference_output_type = tf.int8
+        with open(TFLITE_INT8_PATH, "wb") as f:
+            f.write(converter.convert())
+        print(f"✅ Wrote {TFLITE_INT8_PATH}")
+
+
+def _load_runtime(runtime: str):
+    from ml.face_emotion import _TFLiteModel
+
+    if runtime == "keras":
+        from tensorflow.keras.models import load_model  # type: ignore
+        return load_model(RUNTIMES["keras"])
+    return _TFLiteModel(RUNTIMES[runtime])
+
+
+def check(samples_dir: str | None):
+    """Compare every available TFLite artifact against the Keras outputs."""
+    crops = sample_crops(samples_dir)
+    reference = _load_runtime("keras").predict(crops, verbose=0)
+    ref_idx = reference.argmax(axis=1)
+    ok = True
+    for runtime in ("tflite", "tflite_int8"):
+        if not os.path.exists(RUNTIMES[runtime]):
+            continue
+        model = _load_runtime(runtime)
+        probs = np.concatenate([model.predict(c[np.newaxis, ...]) for c in crops])
+        agreement = float((probs.argmax(axis=1) == ref_idx).mean())
+        max_diff  = float(np.abs(probs - reference).max())
+        # int8 is judged on label agreement; float32 must match closely.
+        passed = agreement >= 0.97 if runtime == "tflite_int8" else max_diff < 1e-3
+        ok = ok and passed
+        print(f"{'✅' if passed else '❌'} {runtime}: top-1 agreement={agreement:.4f} "
+              f"max |Δp|={max_diff:.5f} over {len(crops)} crops")
+    return ok
+
+
+def _bench_one(runtime: str, samples_dir: str | None, n: int) -> dict:
+    from ml.model_registry import current_rss_mb
+
+    crops = sample_crops(samples_dir, limit=n)
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    model = _load_runtime(runtime)
+    model.predict(crops[:1], verbose=0)  # first call builds/allocates
+    load_ms = (time.perf_counter() - start) * 1000
+    rss_after = current_rss_mb()
+
+    latencies = []
+    for crop in crops:
+        t = time.perf_counter()
+        model.predict(crop[np.newaxis, ...], verbose=0)
+        latencies.append((time.perf_counter() - t) * 1000)
+    return {
+        "runtime": runtime,
+        "load_ms": round(load_ms, 1),
+        "rss_mb": round(rss_after - rss_before, 1),
+        "process_rss_mb": round(rss_after, 1),
+        "per_crop_ms_p50": round(float(np.percentile(latencies, 50)), 3),
+        "per_crop_ms_p95": round(float(np.percentile(latencies, 95)), 3),
+    }
+
+
+def bench(samples_dir: str | None, n: int):
+    """Benchmark each runtime in a fresh interpreter so load/RSS are isolated."""
+    rows = []
+    for runtime, path in RUNTIMES.items():
+        if not os.path.exists(path):
+            continue
+        cmd = [sys.executable, "-m", "ml.convert_face_model", "--bench-one", runtime, "-n", str(n)]
+        if samples_dir:
+            cmd += ["--samples", samples_dir]
+        out = subprocess.run(cmd, capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(__file__)))
+        if out.returncode != 0:
+            print(f"❌ {runtime} benchmark failed:\n{out.stderr[-2000:]}")
+            continue
+        rows.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{'runtime':<12} {'load_ms':>9} {'rss_mb':>8} {'p50_ms':>8} {'p95_ms':>8}")
+    for r in rows:
+        print(f"{r['runtime']:<12} {r['load_ms']:>9} {r['rss_mb']:>8} "
+              f"{r['per_crop_ms_p50']:>8} {r['per_crop_ms_p95']:>8}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--int8", action="store_true", help="also write an int8-quantized model")
+    parser.add_argument("--check", action="store_true", help="parity check against Keras")
+    parser.add_argument("--bench", action="store_true", help="benchmark keras vs tflite runtimes")
+    parser.add_argument("--samples", help="directory of sample face images")
+    parser.add_argument("-n", type=int, default=200, help="crops used for check/bench")
+    parser.add_argument("--bench-one", choices=list(RUNTIMES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.bench_one:
+        print(json.dumps(_bench_one(args.bench_one, args.samples, args.n)))
+        return
+    if not args.check and not args.bench:
+        convert(args.int8, args.samples)
+    if args.check and not check(args.samples):
+        sys.exit(1)
+    if args.bench:
+        bench(args.samples, args.n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Export a dynamically int8-quantized copy of the fine-tuned text model
+(ml/models/text_emotion_model/) for TEXT_RUNTIME=int8 in ml.text_emotion.
+
+Usage:
+  python -m ml.convert_text_model                 # write text_emotion_model_int8/
+  python -m ml.convert_text_model --check         # fp32 vs int8 label agreement
+  python -m ml.convert_text_model --bench         # load time / RSS / latency
+
+All nn.Linear layers are quantized to int8 weights with dynamic activation
+quantization (torch.quantization.quantize_dynamic); embeddings and
+LayerNorm stay fp32.
+
+--check and --bench replay logged texts: entries in ml/logs/predictions*.jsonl
+that carry a "text" field (the API writes it when PRED_LOG_TEXT=1), or
+--texts FILE (one text per line, or JSONL with a "text" field). Without
+either a small built-in sample is used.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from ml.text_emotion import INT8_WEIGHTS, _HF_INT8_PATH, _HF_PATH
+
+RUNTIMES = {"fp32": _HF_PATH, "int8": _HF_INT8_PATH}
+
+_SAMPLE_TEXTS = [
+    "I feel amazing today, everything is going my way!",
+    "Nobody calls me anymore and I feel so alone.",
+    "I can't stop worrying about the exam tomorrow.",
+    "This deadline is crushing me, I have way too much on my plate.",
+    "Why does everyone keep ignoring what I say? It's infuriating.",
+    "Just a normal day, nothing special happened.",
+    "I'm so tired, I could sleep for a week.",
+    "We're going to the concert tonight, I can't wait!",
+    "Sitting by the lake with a cup of tea, feeling peaceful.",
+    "I miss my family so much it hurts.",
+]
+
+
+def load_texts(path: str | None, limit: int) -> list:
+    """Texts from --texts, else from the prediction log, else the built-in sample."""
+    texts = []
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith("{"):
+                    try:
+                        line = str(json.loads(line).get("text") or "")
+                    except json.JSONDecodeError:
+                        pass
+                if line:
+                    texts.append(line)
+    else:
+        from ml.prediction_log import iter_records
+        texts = [r["text"] for r in iter_records() if isinstance(r.get("text"), str) and r["text"].strip()]
+    if not texts:
+        print("⚠️  No logged texts found (set PRED_LOG_TEXT=1 or pass --texts) — using built-in sample")
+        texts = list(_SAMPLE_TEXTS)
+    return texts[-limit:]
+
+
+def convert():
+    import torch  # type: ignore
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer  # type: ignore
+
+    model = AutoModelForSequenceClassification.from_pretrained(_HF_PATH).eval()
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    os.makedirs(_HF_INT8_PATH, exist_ok=True)
+    model.config.save_pretrained(_HF_INT8_PATH)
+    AutoTokenizer.from_pretrained(_HF_PATH).save_pretrained(_HF_INT8_PATH)
+    torch.save(quantized.state_dict(), os.path.join(_HF_INT8_PATH, INT8_WEIGHTS))
+    labels_json = os.path.join(_HF_PATH, "echona_labels.json")
+    if os.path.exists(labels_json):
+        shutil.copy(labels_json, _HF_INT8_PATH)
+
+    fp32_mb = os.path.getsize(os.path.join(_HF_PATH, _weights_file(_HF_PATH))) / (1024 * 1024)
+    int8_mb = os.path.getsize(os.path.join(_HF_INT8_PATH, INT8_WEIGHTS)) / (1024 * 1024)
+    print(f"✅ Wrote {_HF_INT8_PATH} (weights {fp32_mb:.1f} MB → {int8_mb:.1f} MB)")
+
+
+def _weights_file(path: str) -> str:
+    for name in ("model.safetensors", "pytorch_model.bin"):
+        if os.path.exists(os.path.join(path, name)):
+            return name
+    raise FileNotFoundError(f"No model weights in {path}")
+
+
+def _load_runtime(runtime: str):
+    from transformers import pipeline as hf_pipeline  # type: ignore
+
+    if runtime == "int8":
+        from transformers import AutoTokenizer  # type: ignore
+        from ml.text_emotion import _quantized_model
+        model, tokenizer = _quantized_model(_HF_INT8_PATH), AutoTokenizer.from_pretrained(_HF_INT8_PATH)
+    else:
+        model, tokenizer = _HF_PATH, None
+    return hf_pipeline("text-classification", model=model, tokenizer=tokenizer, top_k=None)
+
+
+def _probs(pipe, texts: list) -> tuple[np.ndarray, list]:
+    """N×labels probability matrix (labels in a fixed order) for texts."""
+    outputs = pipe(texts, batch_size=32, truncation=True)
+    labels = sorted(s["label"] for s in outputs[0])
+    return np.array([[{s["label"]: s["score"] for s in out}[l] for l in labels] for out in outputs]), labels
+
+
+def check(texts_path: str | None, n: int, min_agreement: float):
+    """Top-1 agreement and probability drift of int8 against fp32."""
+    texts = load_texts(texts_path, n)
+    ref, labels = _probs(_load_runtime("fp32"), texts)
+    probs, _ = _probs(_load_runtime("int8"), texts)
+    ref_idx, idx = ref.argmax(axis=1), probs.argmax(axis=1)
+    agreement = float((idx == ref_idx).mean())
+    max_diff  = float(np.abs(probs - ref).max())
+    passed = agreement >= min_agreement
+    print(f"{'✅' if passed else '❌'} int8: top-1 agreement={agreement:.4f} "
+          f"max |Δp|={max_diff:.4f} mean |Δp|={float(np.abs(probs - ref).mean()):.4f} over {len(texts)} texts")
+    for i in np.flatnonzero(idx != ref_idx)[:10]:
+        print(f"   {labels[ref_idx[i]]:>8} → {labels[idx[i]]:<8} {texts[i][:80]!r}")
+    return passed
+
+
+def _bench_one(runtime: str, texts_path: str | None, n: int) -> dict:
+    from ml.model_registry import current_rss_mb
+
+    texts = load_texts(texts_path, n)
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    pipe = _load_runtime(runtime)
+    pipe(texts[0])  # first call allocates
+    load_ms = (time.perf_counter() - start) * 1000
+    rss_after = current_rss_mb()
+
+    latencies = []
+    for text in texts:
+        t = time.perf_counter()
+        pipe(text, truncation=True)
+        latencies.append((time.perf_counter() - t) * 1000)
+    t = time.perf_counter()
+    pipe(texts, batch_size=32, truncation=True)
+    batch_ms = (time.perf_counter() - t) * 1000 / len(texts)
+    return {
+        "runtime": runtime,
+        "load_ms": round(load_ms, 1),
+        "rss_mb": round(rss_after - rss_before, 1),
+        "process_rss_mb": round(rss_after, 1),
+        "per_text_ms_p50": round(float(np.percentile(latencies, 50)), 2),
+        "per_text_ms_p95": round(float(np.percentile(latencies, 95)), 2),
+        "batched_ms_per_text": round(batch_ms, 2),
+    }
+
+
+def bench(texts_path: str | None, n: int):
+    """Benchmark each runtime in a fresh interpreter so load/RSS are isolated."""
+    rows = []
+    for runtime, path in RUNTIMES.items():
+        if not os.path.isdir(path):
+            continue
+        cmd = [sys.executable, "-m", "ml.convert_text_model", "--bench-one", runtime, "-n", str(n)]
+        if texts_path:
+            cmd += ["--texts", texts_path]
+        out = subprocess.run(cmd, capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(__file__)))
+        if out.returncode != 0:
+            print(f"❌ {runtime} benchmark failed:\n{out.stderr[-2000:]}")
+            continue
+        rows.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{'runtime':<8} {'load_ms':>9} {'rss_mb':>8} {'p50_ms':>8} {'p95_ms':>8} {'batched_ms':>11}")
+    for r in rows:
+        print(f"{r['runtime']:<8} {r['load_ms']:>9} {r['rss_mb']:>8} "
+              f"{r['per_text_ms_p50']:>8} {r['per_text_ms_p95']:>8} {r['batched_ms_per_text']:>11}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="agreement check against fp32")
+    parser.add_argument("--bench", action="store_true", help="benchmark fp32 vs int8")
+    parser.add_argument("--texts", help="file of texts (lines or JSONL with a \"text\" field)")
+    parser.add_argument("-n", type=int, default=500, help="texts used for check/bench")
+    parser.add_argument("--min-agreement", type=float, default=0.97)
+    parser.add_argument("--bench-one", choices=list(RUNTIMES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.bench_one:
+        print(json.dumps(_bench_one(args.bench_one, args.texts, args.n)))
+        return
+    if not args.check and not args.bench:
+        convert()
+    if args.check and not check(args.texts, args.n, args.min_agreement):
+        sys.exit(1)
+    if args.bench:
+        bench(args.texts, args.n)
+
+
+if __name__ == "__main__":
+    main()
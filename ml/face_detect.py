@@ -0,0 +1,84 @@
+"""
+Haar-cascade face detection for the face emotion pipeline.
+
+  - one CascadeClassifier per thread (built once, not per request;
+    OpenCV classifiers are not safe to share across threads)
+  - detection runs on a copy downscaled to FACE_DETECT_MAX_SIDE, and the
+    boxes are mapped back to full resolution so the crop handed to the CNN
+    still comes from the original frame
+  - min/max face size are derived from the image dimensions
+    (FACE_MIN_FRAC / FACE_MAX_FRAC of the shorter side); the minimum is off
+    by default, so small faces in wide shots are still found
+  - per-stage timings are returned alongside the boxes
+"""
+
+import os
+import threading
+import time
+import cv2
+from ml.timing import elapsed_ms
+
+CASCADE_PATH  = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+MAX_SIDE      = int(os.getenv("FACE_DETECT_MAX_SIDE", "640"))
+MIN_FACE_FRAC = float(os.getenv("FACE_MIN_FRAC", "0"))
+MAX_FACE_FRAC = float(os.getenv("FACE_MAX_FRAC", "1.0"))
+SCALE_FACTOR  = 1.3
+MIN_NEIGHBORS = 5
+
+_CASCADE_WINDOW = 24  # training window of haarcascade_frontalface_default
+_local = threading.local()
+
+
+def get_cascade() -> cv2.CascadeClassifier:
+    """Per-thread cached face cascade."""
+    cascade = getattr(_local, "cascade", None)
+    if cascade is None:
+        cascade = cv2.CascadeClassifier(CASCADE_PATH)
+        if cascade.empty():
+            raise RuntimeError(f"Could not load face cascade: {CASCADE_PATH}")
+        _local.cascade = cascade
+    return cascade
+
+
+def face_size_limits(height: int, width: int, scale: float = 1.0):
+    """(minSize, maxSize) in detection-image pixels for a frame of this size."""
+    short_side = min(height, width)
+    lo = max(_CASCADE_WINDOW, int(short_side * MIN_FACE_FRAC * scale))
+    hi = max(lo, int(short_side * MAX_FACE_FRAC * scale))
+    return (lo, lo), (hi, hi)
+
+
+def detect_faces(gray, max_side: int = MAX_SIDE):
+    """
+    Detect faces in a grayscale frame.
+
+    Returns (faces, timings) where faces is a list of (x, y, w, h) boxes in
+    full-resolution coordinates, in the order the cascade reported them.
+    """
+    timings = {}
+    h, w = gray.shape[:2]
+
+    start = time.perf_counter()
+    scale = 1.0
+    small = gray
+    if max_side > 0 and max(h, w) > max_side:
+        scale = max_side / float(max(h, w))
+        small = cv2.resize(gray, (max(1, int(w * scale)), max(1, int(h * scale))),
+                           interpolation=cv2.INTER_AREA)
+    timings["downscale_ms"] = elapsed_ms(start)
+
+    start = time.perf_counter()
+    min_size, max_size = face_size_limits(h, w, scale)
+    raw = get_cascade().detectMultiScale(
+        small, SCALE_FACTOR, MIN_NEIGHBORS, minSize=min_size, maxSize=max_size,
+    )
+    timings["detect_ms"] = elapsed_ms(start)
+
+    faces = []
+    for (x, y, fw, fh) in raw:
+        x0 = int(round(x / scale))
+        y0 = int(round(y / scale))
+        x1 = min(w, int(round((x + fw) / scale)))
+        y1 = min(h, int(round((y + fh) / scale)))
+        faces.append((x0, y0, x1 - x0, y1 - y0))
+    return faces, timings
@@ -0,0 +1,216 @@
+"""
+Webcam streaming mode for face emotion.
+
+A FaceStream keeps per-session state so consecutive frames can share work:
+
+  - near-duplicate frames (tiny-thumbnail mean abs diff below
+    FACE_STREAM_DUP_DIFF) skip detection and inference entirely and
+    return the last smoothed result
+  - the face box is reused between detections; the Haar detector only
+    re-runs every FACE_STREAM_DETECT_EVERY frames, or earlier when the
+    tracked face region drifts (FACE_STREAM_DRIFT_DIFF)
+  - the emotion distribution is exponentially smoothed across frames
+    (FACE_STREAM_ALPHA weight on the newest frame)
+
+Sessions live in a FaceStreamStore, expire after FACE_STREAM_TTL_SEC of
+inactivity and are capped at FACE_STREAM_MAX_SESSIONS (oldest dropped).
+Session ids are always issued here; a client can only resume an id it was
+given, never pick one.
+"""
+
+import os
+import threading
+import time
+import uuid
+import cv2
+import numpy as np
+from ml.face_detect import MAX_SIDE as DETECT_MAX_SIDE, detect_faces
+from ml.fusion import ALL_EMOTIONS, _result_to_probs
+from ml.image_io import decode_gray
+from ml.timing import elapsed_ms
+
+DETECT_EVERY = int(os.getenv("FACE_STREAM_DETECT_EVERY", "5"))
+DUP_DIFF     = float(os.getenv("FACE_STREAM_DUP_DIFF", "2.0"))
+DRIFT_DIFF   = float(os.getenv("FACE_STREAM_DRIFT_DIFF", "18.0"))
+ALPHA        = float(os.getenv("FACE_STREAM_ALPHA", "0.4"))
+TTL_SEC      = float(os.getenv("FACE_STREAM_TTL_SEC", "60"))
+MAX_SESSIONS = int(os.getenv("FACE_STREAM_MAX_SESSIONS", "200"))
+
+_THUMB = (32, 32)
+
+
+def _thumb(gray):
+    return cv2.resize(gray, _THUMB, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+def _diff(a, b) -> float:
+    return float(np.mean(np.abs(a - b)))
+
+
+def _iou(a, b) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+class FaceStream:
+    """Per-session tracking + smoothing state."""
+
+    def __init__(self, session_id: str):
+        self.session_id  = session_id
+        self.lock        = threading.Lock()
+        self.frames      = 0
+        self.inferences  = 0
+        self.detections  = 0
+        self.skipped     = 0
+        self.last_seen   = time.time()
+        self._frame_thumb = None
+        self._face_thumb  = None
+        self._box         = None
+        self._since_detect = 0
+        self._smoothed    = None
+        self._last        = None
+
+    def process(self, image, quality: str = "best") -> dict:
+        """Analyse one frame (raw bytes or base64 data URL)."""
+        from ml.face_emotion import _classify_face
+
+        with self.lock:
+            self.frames   += 1
+            self.last_seen = time.time()
+            timings = {}
+
+            start = time.perf_counter()
+            gray, decode_scale = decode_gray(image, target_side=DETECT_MAX_SIDE)
+            timings["decode_ms"] = elapsed_ms(start)
+            if gray is None:
+                return {"emotion": "Calm", "confidence": 0.0, "source": "fallback",
+                        "frame": self.frames, "timings": timings}
+
+            frame_thumb = _thumb(gray)
+            if (
+                self._last is not None
+                and self._frame_thumb is not None
+                and _diff(frame_thumb, self._frame_thumb) < DUP_DIFF
+            ):
+                self.skipped += 1
+                return {**self._last, "frame": self.frames, "skipped": True, "detected": False,
+                        "timings": timings}
+            self._frame_thumb = frame_thumb
+
+            box = self._track(gray, timings)
+            x, y, w, h = box
+            face_gray = gray[y:y+h, x:x+w]
+            self._face_thumb = _thumb(face_gray)
+
+            result = _classify_face(face_gray, gray, timings, distribution=True, quality=quality)
+            self.inferences += 1
+            dist = result.get("distribution") or dict(zip(ALL_EMOTIONS, _result_to_probs(result)))
+            self._smooth(dist)
+
+            emotion = max(self._smoothed, key=self._smoothed.get)
+            self._last = {
+                "emotion":      emotion,
+                "confidence":   round(self._smoothed[emotion], 4),
+                "source":       result["source"],
+                "raw_emotion":  result["emotion"],
+                "raw_confidence": result["confidence"],
+                "distribution": {k: round(v, 4) for k, v in sorted(self._smoothed.items(), key=lambda x: -x[1])},
+                # in original-frame pixels (frames may be decoded at reduced scale)
+                "box":          [int(v) * decode_scale for v in box],
+            }
+            return {**self._last, "frame": self.frames, "skipped": False,
+                    "detected": self._since_detect == 0, "timings": timings}
+
+    def _track(self, gray, timings: dict):
+        """Reuse the previous box unless it is time to re-detect or the face drifted."""
+        h, w = gray.shape[:2]
+        if self._box is not None and self._since_detect + 1 < DETECT_EVERY:
+            x, y, bw, bh = self._box
+            if x + bw <= w and y + bh <= h:
+                crop_thumb = _thumb(gray[y:y+bh, x:x+bw])
+                if self._face_thumb is not None and _diff(crop_thumb, self._face_thumb) < DRIFT_DIFF:
+                    self._since_detect += 1
+                    return self._box
+
+        faces, detect_timings = detect_faces(gray)
+        timings.update(detect_timings)
+        self.detections   += 1
+        self._since_detect = 0
+        if faces:
+            if self._box is not None:
+                box = max(faces, key=lambda f: (_iou(f, self._box), f[2] * f[3]))
+            else:
+                box = faces[0]
+            self._box = tuple(int(v) for v in box)
+        else:
+            # Keep the last known face for a lost detection, else the full frame.
+            self._box = self._box or (0, 0, w, h)
+        return self._box
+
+    def _smooth(self, dist: dict):
+        total = sum(dist.values()) or 1.0
+        dist = {k: v / total for k, v in dist.items()}
+        if self._smoothed is None:
+            self._smoothed = dist
+            return
+        keys = set(self._smoothed) | set(dist)
+        self._smoothed = {
+            k: ALPHA * dist.get(k, 0.0) + (1 - ALPHA) * self._smoothed.get(k, 0.0)
+            for k in keys
+        }
+
+    def stats(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "frames":     self.frames,
+            "inferences": self.inferences,
+            "detections": self.detections,
+            "skipped":    self.skipped,
+        }
+
+
+class FaceStreamStore:
+    """Session id → FaceStream, with idle expiry and a session cap."""
+
+    def __init__(self, ttl_sec: float = TTL_SEC, max_sessions: int = MAX_SESSIONS):
+        self.ttl_sec      = ttl_sec
+        self.max_sessions = max_sessions
+        self._sessions    = {}
+        self._lock        = threading.Lock()
+
+    def get_or_create(self, session_id: str | None = None) -> FaceStream:
+        """The live session for session_id; unknown or expired ids get a new server-issued one."""
+        with self._lock:
+            self._expire()
+            if session_id and session_id in self._sessions:
+                return self._sessions[session_id]
+            session_id = uuid.uuid4().hex
+            if len(self._sessions) >= self.max_sessions:
+                oldest = min(self._sessions.values(), key=lambda s: s.last_seen)
+                self._sessions.pop(oldest.session_id, None)
+            stream = FaceStream(session_id)
+            self._sessions[session_id] = stream
+            return stream
+
+    def close(self, session_id: str):
+        with self._lock:
+            stream = self._sessions.pop(session_id, None)
+        return stream.stats() if stream else None
+
+    def _expire(self):
+        now = time.time()
+        for sid, stream in list(self._sessions.items()):
+            if now - stream.last_seen > self.ttl_sec:
+                self._sessions.pop(sid, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"active_sessions": len(self._sessions)}
+
+
+face_streams = FaceStreamStore()
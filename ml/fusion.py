@@ -8,6 +8,7 @@ Fallback: weighted vote  face 40%, voice 30%, text 30%.
 import os
 import pickle
 from collections import defaultdict
+from ml.model_registry import registry
 
 WEIGHTS = {"face": 0.40, "voice": 0.30, "text": 0.30}
 
@@ -20,26 +21,23 @@ EMO_IDX = {e: i for i, e in enumerate(ALL_EMOTIONS)}
 _MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ml", "models")
 _FUSION_MODEL_PATH = os.path.join(_MODELS_DIR, "fusion_model.pkl")
 
-_fusion_payload = None   # loaded once
-_fusion_tried   = False  # avoid repeated failed loads
+def _build_fusion_model():
+    if not os.path.exists(_FUSION_MODEL_PATH):
+        raise FileNotFoundError(f"Fusion model not found at {_FUSION_MODEL_PATH}")
+    with open(_FUSION_MODEL_PATH, "rb") as f:
+        return pickle.load(f)
+
+
+registry.register("fusion_model", _build_fusion_model)
 
 
 def load_fusion_model():
     """
-    Load the trained meta-classifier from disk (once).
+    Load the trained meta-classifier from disk (once, via ml.model_registry).
     Returns the sklearn model, or None if not available.
     """
-    global _fusion_payload, _fusion_tried
-    if _fusion_tried:
-        return _fusion_payload.get("model") if _fusion_payload else None
-    _fusion_tried = True
-    if os.path.exists(_FUSION_MODEL_PATH):
-        try:
-            with open(_FUSION_MODEL_PATH, "rb") as f:
-                _fusion_payload = pickle.load(f)
-        except Exception:
-            _fusion_payload = None
-    return _fusion_payload.get("model") if _fusion_payload else None
+    payload = registry.get("fusion_model")
+    return payload.get("model") if payload else None
 
 
 def _result_to_probs(result: dict | None) -> list[float]:
@@ -0,0 +1,83 @@
+"""
+Image decoding for the face endpoints.
+
+Images arrive either as raw bytes (multipart / octet-stream uploads) or as
+a base64 data URL. decode_gray() goes straight to a single-channel image
+(no BGR copy + cvtColor), and for JPEGs that are far larger than face
+detection needs it uses libjpeg's DCT scaling (IMREAD_REDUCED_GRAYSCALE_*)
+so the full-resolution frame is never materialised.
+"""
+
+import base64
+import struct
+import cv2
+import numpy as np
+
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+)
+# JPEG start-of-frame markers (SOF0..SOF15 minus DHT/JPG/DAC).
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def to_bytes(image) -> bytes:
+    """Raw bytes from bytes or a (data URL / bare) base64 string."""
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return bytes(image)
+    encoded = image.split(",", 1)[1] if "," in image else image
+    return base64.b64decode(encoded)
+
+
+def jpeg_dimensions(buf: bytes):
+    """(height, width) from a JPEG header, or None if not a parsable JPEG."""
+    if len(buf) < 4 or buf[0] != 0xFF or buf[1] != 0xD8:
+        return None
+    i = 2
+    n = len(buf)
+    while i + 9 < n:
+        if buf[i] != 0xFF:
+            i += 1
+            continue
+        marker = buf[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7):
+            i += 2
+            continue
+        seg_len = struct.unpack(">H", buf[i + 2:i + 4])[0]
+        if marker in _SOF_MARKERS:
+            h, w = struct.unpack(">HH", buf[i + 5:i + 9])
+            return h, w
+        i += 2 + seg_len
+    return None
+
+
+def reduction_factor(height: int, width: int, target_side: int) -> int:
+    """Largest 2/4/8 downscale that keeps the long side >= target_side."""
+    if target_side <= 0:
+        return 1
+    for factor, _ in _REDUCED_FLAGS:
+        if max(height, width) // factor >= target_side:
+            return factor
+    return 1
+
+
+def decode_gray(image, target_side: int = 0):
+    """
+    Decode to grayscale. Returns (gray or None, scale) where scale is the
+    reduction factor applied at decode time (1 = full resolution).
+    """
+    buf = to_bytes(image)
+    arr = np.frombuffer(buf, np.uint8)
+    dims = jpeg_dimensions(buf)
+    if dims is not None:
+        factor = reduction_factor(*dims, target_side)
+        if factor > 1:
+            flag = dict(_REDUCED_FLAGS)[factor]
+            gray = cv2.imdecode(arr, flag)
+            if gray is not None:
+                return gray, factor
+    return cv2.imdecode(arr, cv2.IMREAD_GRAYSCALE), 1
@@ -0,0 +1,164 @@
+"""
+Single-pass keyword scoring for the text fallbacks.
+
+Three keyword vocabularies used to be scanned separately on every call:
+
+  - mood patterns   (text_emotion.analyze_text_emotion_simple, 10 moods, weighted)
+  - loneliness cues (text_emotion._lonely_signal_score)
+  - quick fallback  (api._simple_text_fallback, first matching mood wins)
+
+Here every term from all three is compiled once into a single regex: the
+word terms as a character trie (so the engine narrows by prefix instead of
+trying each alternative in turn), plus the emoji and wildcard terms. One
+finditer pass over the lowercased text yields every hit, and each hit
+fans out to all the vocabularies that contain that term.
+
+All terms match as whole words (\\b on both sides), as the mood patterns
+always did; emoji match anywhere.
+"""
+
+import re
+from collections import defaultdict
+
+MOODS = ["Happy", "Sad", "Angry", "Anxious", "Stressed", "Lonely", "Tired", "Excited", "Calm", "Neutral"]
+
+# mood -> [(weight, terms)]
+MOOD_TERMS = {
+    "Happy": [
+        (2, "happy joy joyful delighted cheerful wonderful amazing fantastic great awesome love loved loving grateful bliss"),
+        (1, "good nice pleasant lovely enjoy glad pleased"),
+        (2, ["😊", "😄", "😃", "🙂", "😁", "🥰", "❤️", "💕"]),
+    ],
+    "Sad": [
+        (2, "sad depressed unhappy miserable upset down heartbroken crying cry tears grief sorrow hopeless"),
+        (1, "disappointed pessimistic gloomy despair broken"),
+        (2, ["😢", "😭", "😔", "☹️", "😞"]),
+    ],
+    "Angry": [
+        (2, "angry mad furious rage outraged irritated annoyed frustrated hate hatred disgust"),
+        (1, "pissed aggravated bitter resentful"),
+        (2, ["😠", "😡", "🤬", "😤"]),
+    ],
+    "Anxious": [
+        (2, "anxious worried nervous panic fear scared afraid terrified uneasy apprehensive"),
+        (1, "uncertain concerned dread phobia"),
+        (2, ["😰", "😨", "😱", "😟", "😧"]),
+    ],
+    "Stressed": [
+        (2, "stressed overwhelmed pressure burnout tense overloaded deadline exhausting chaotic"),
+        (1, "swamped buried frantic hectic"),
+    ],
+    "Lonely": [
+        (2, ["lonely", "alone", "isolated", "miss", "abandoned", "disconnected", "left out", "no one", "nobody"]),
+        (1, "forgotten invisible unwanted"),
+    ],
+    "Tired": [
+        (2, ["tired", "exhausted", "sleepy", "fatigued", "drained", "bored", "boring", "monoton",
+             "lethargic", "weary", "burnt out"]),
+        (1, "numb flat meh blah sluggish"),
+    ],
+    "Excited": [
+        (2, "excited thrilled enthusiastic eager pumped energized motivated hyped stoked"),
+        (1, ["can.t wait", "looking forward", "incredible", "unbelievable"]),
+        (2, ["🎉", "🎊", "🥳", "🤩", "✨"]),
+    ],
+    "Calm": [
+        (2, "calm peaceful relaxed serene tranquil content satisfied comfortable okay fine alright steady"),
+        (2, ["😌", "🙏", "🧘"]),
+    ],
+    "Neutral": [
+        (1, ["neutral", "normal", "nothing", "just", "whatever", "idk", "hmm", "so so", "meh"]),
+    ],
+}
+
+LONELY_TERMS = ["lonely", "alone", "isolated", "no one", "nobody", "left out", "disconnected",
+                "feel unseen", "abandoned"]
+
+# Checked in this order; the first mood with any hit wins.
+QUICK_TERMS = {
+    "Happy":   "happy great good awesome joy excited wonderful",
+    "Sad":     "sad down depressed cry crying upset lonely",
+    "Angry":   "angry mad furious annoyed rage",
+    "Anxious": "anxious worried stress stressed nervous panic fear",
+    "Excited": "excited thrilled amazing fantastic",
+}
+
+# Terms that are regex fragments rather than literals.
+_PATTERN_TERMS = {"can.t wait"}
+
+
+def _terms(spec):
+    return spec.split() if isinstance(spec, str) else list(spec)
+
+
+def _trie_regex(words) -> str:
+    """Alternation of `words` as a prefix trie, longest continuation first."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def emit(node):
+        end = node.get("") is True
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if end:
+            return "(?:" + body + ")?" if len(branches) > 1 or len(body) > 1 else body + "?"
+        return body
+
+    return emit(trie)
+
+
+def _build():
+    # term -> [(kind, mood, weight)]; kind is "mood" | "lonely" | "quick"
+    contributions = defaultdict(list)
+    for mood, groups in MOOD_TERMS.items():
+        for weight, spec in groups:
+            for term in _terms(spec):
+                contributions[term].append(("mood", mood, weight))
+    for term in LONELY_TERMS:
+        contributions[term].append(("lonely", None, 1))
+    for mood, spec in QUICK_TERMS.items():
+        for term in _terms(spec):
+            contributions[term].append(("quick", mood, 1))
+
+    words    = [t for t in contributions if t not in _PATTERN_TERMS and re.fullmatch(r"[\w' ]+", t)]
+    symbols  = [t for t in contributions if t not in _PATTERN_TERMS and t not in words]
+    patterns = sorted(_PATTERN_TERMS & set(contributions))
+
+    parts = [r"\b(?P<w>" + _trie_regex(words) + r")\b"]
+    if symbols:
+        parts.append("(?P<s>" + "|".join(re.escape(s) for s in sorted(symbols, key=len, reverse=True)) + ")")
+    for i, pattern in enumerate(patterns):
+        parts.append(rf"\b(?P<p{i}>{pattern})\b")
+    return re.compile("|".join(parts)), dict(contributions), patterns
+
+
+_REGEX, _CONTRIBUTIONS, _PATTERNS = _build()
+
+
+def score_text(text: str) -> dict:
+    """
+    Scan `text` once. Returns
+      moods:       {mood: weighted score} for all 10 moods (MOODS order)
+      lonely_hits: number of loneliness cues
+      quick:       {mood: hits} for the quick-fallback vocabulary
+    """
+    moods  = dict.fromkeys(MOODS, 0)
+    quick  = dict.fromkeys(QUICK_TERMS, 0)
+    lonely = 0
+    for m in _REGEX.finditer(text.lower()):
+        group = m.lastgroup
+        term = m.group() if group in ("w", "s") else _PATTERNS[int(group[1:])]
+        for kind, mood, weight in _CONTRIBUTIONS[term]:
+            if kind == "mood":
+                moods[mood] += weight
+            elif kind == "lonely":
+                lonely += weight
+            else:
+                quick[mood] += weight
+    return {"moods": moods, "lonely_hits": lonely, "quick": quick}
@@ -0,0 +1,274 @@
+"""
+Process-wide model registry.
+
+Every model in ml/ is registered here with a loader callable and fetched
+with registry.get(name):
+
+  - single-flight: each model has its own lock, so a burst of concurrent
+    first requests triggers exactly one load; other callers wait for it
+  - failures are sticky (like the old *_ERR globals) until reset(name)
+  - the approximate RSS cost of each load is measured, and when the total
+    exceeds MODEL_MEMORY_BUDGET_MB the least-recently-used idle models are
+    unloaded (they are reloaded on next use); first loads are measured one
+    at a time so concurrent loads do not inflate each other's delta, and
+    that first figure is kept across reloads
+  - MODEL_IDLE_TTL_SEC > 0 also unloads models that have not been used for
+    that long, checked by a background sweeper thread
+
+The registry is the only long-lived owner of model objects; callers should
+not cache what get() returns in module globals, or eviction frees nothing.
+"""
+
+import gc
+import os
+import threading
+import time
+
+MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "384"))
+MIN_IDLE_SEC     = float(os.getenv("MODEL_MIN_IDLE_SEC", "30"))
+IDLE_TTL_SEC     = float(os.getenv("MODEL_IDLE_TTL_SEC", "0"))
+SWEEP_SEC        = float(os.getenv("MODEL_SWEEP_SEC", "30"))
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (0.0 if it cannot be read)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except Exception:
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, kilobytes on Linux.
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except Exception:
+        return 0.0
+
+
+class _Entry:
+    def __init__(self, name, loader, unloader, pinned):
+        self.name      = name
+        self.loader    = loader
+        self.unloader  = unloader
+        self.pinned    = pinned
+        self.lock      = threading.Lock()
+        self.value     = None
+        self.loaded    = False
+        self.loading   = False
+        self.error     = None
+        self.rss_mb    = 0.0
+        self.load_ms   = 0.0
+        self.loads     = 0
+        self.evictions = 0
+        self.hits      = 0
+        self.last_used = 0.0
+        self.infer_count = 0
+        self.infer_ms    = 0.0
+        self.infer_last_ms = 0.0
+
+
+class ModelRegistry:
+    def __init__(
+        self,
+        budget_mb: float = MEMORY_BUDGET_MB,
+        min_idle_sec: float = MIN_IDLE_SEC,
+        idle_ttl_sec: float = IDLE_TTL_SEC,
+        sweep_sec: float = SWEEP_SEC,
+    ):
+        self.budget_mb    = budget_mb
+        self.min_idle_sec = min_idle_sec
+        self.idle_ttl_sec = idle_ttl_sec
+        self.sweep_sec    = sweep_sec
+        self._entries     = {}
+        self._lock        = threading.Lock()
+        # Held around first loads so each RSS delta covers one model only
+        # (reentrant: a loader may get() another model).
+        self._measure_lock = threading.RLock()
+        self._sweeper     = None
+
+    def register(self, name: str, loader, unloader=None, pinned: bool = False):
+        """
+        Register a model. `loader()` returns the loaded object or raises;
+        `unloader(obj)` optionally releases framework state on eviction.
+        Pinned models are never evicted. Re-registering a name is a no-op.
+        """
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = _Entry(name, loader, unloader, pinned)
+        self._ensure_sweeper()
+
+    def get(self, name: str):
+        """Return the loaded model, loading it once if needed; None if it failed."""
+        entry = self._entries[name]
+        # Lock-free fast path: read the value once; unload() may clear it at
+        # any moment, and a None here must not be reported as "unavailable".
+        value = entry.value
+        if value is not None:
+            entry.last_used = time.time()
+            entry.hits += 1
+            return value
+        if entry.error is not None:
+            return None
+
+        with entry.lock:
+            # Another thread may have finished the load while we waited.
+            if entry.loaded:
+                entry.last_used = time.time()
+                entry.hits += 1
+                return entry.value
+            if entry.error is not None:
+                return None
+
+            entry.loading = True
+            # A reload after eviction keeps the first-load figure: its delta
+            # misses framework imports (TF/torch stay resident), which
+            # eviction never frees either way.
+            measure = entry.loads == 0
+            if measure:
+                self._measure_lock.acquire()
+            try:
+                rss_before = current_rss_mb()
+                start_t = time.perf_counter()
+                try:
+                    value = entry.loader()
+                except Exception as e:
+                    entry.error = str(e) or e.__class__.__name__
+                    entry.loading = False
+                    return None
+                if measure:
+                    entry.rss_mb = round(max(0.0, current_rss_mb() - rss_before), 1)
+            finally:
+                if measure:
+                    self._measure_lock.release()
+            entry.load_ms   = round((time.perf_counter() - start_t) * 1000, 2)
+            entry.value     = value
+            entry.loaded    = True
+            entry.loading   = False
+            entry.loads    += 1
+            entry.last_used = time.time()
+
+        self.enforce_budget(keep=name)
+        return value
+
+    def record_inference(self, name: str, ms: float, items: int = 1):
+        """Record time spent in one model call (covering `items` inputs)."""
+        entry = self._entries.get(name)
+        if entry is None:
+            return
+        entry.infer_count  += items
+        entry.infer_ms     += ms
+        entry.infer_last_ms = ms
+
+    def error(self, name: str):
+        entry = self._entries.get(name)
+        return entry.error if entry else None
+
+    def is_loaded(self, name: str) -> bool:
+        entry = self._entries.get(name)
+        return bool(entry and entry.loaded)
+
+    def reset(self, name: str):
+        """Forget a sticky failure (or unload) so the next get() retries."""
+        entry = self._entries[name]
+        with entry.lock:
+            entry.error = None
+        self.unload(name)
+
+    def unload(self, name: str) -> bool:
+        entry = self._entries[name]
+        with entry.lock:
+            if not entry.loaded:
+                return False
+            value = entry.value
+            entry.value  = None
+            entry.loaded = False
+            entry.evictions += 1
+        if entry.unloader is not None:
+            try:
+                entry.unloader(value)
+            except Exception as e:
+                print(f"⚠️  Unloading {name} failed: {e}")
+        del value
+        gc.collect()
+        print(f"♻️  Model unloaded: {name}")
+        return True
+
+    def total_rss_mb(self) -> float:
+        return round(sum(e.rss_mb for e in self._entries.values() if e.loaded), 1)
+
+    def enforce_budget(self, keep: str | None = None):
+        """Unload LRU idle models until the loaded total fits the budget."""
+        if self.budget_mb <= 0:
+            return
+        now = time.time()
+        candidates = sorted(
+            (
+                e for e in self._entries.values()
+                if e.loaded and not e.pinned and e.name != keep
+                and now - e.last_used >= self.min_idle_sec
+            ),
+            key=lambda e: e.last_used,
+        )
+        for entry in candidates:
+            if self.total_rss_mb() <= self.budget_mb:
+                break
+            self.unload(entry.name)
+
+    def sweep(self):
+        """Unload models idle past the TTL, then re-check the budget."""
+        if self.idle_ttl_sec > 0:
+            now = time.time()
+            for entry in list(self._entries.values()):
+                if entry.loaded and not entry.pinned and now - entry.last_used >= self.idle_ttl_sec:
+                    self.unload(entry.name)
+        self.enforce_budget()
+
+    def stats(self) -> dict:
+        now = time.time()
+        models = {}
+        for name, e in self._entries.items():
+            state = "loaded" if e.loaded else "loading" if e.loading else "failed" if e.error else "unloaded"
+            models[name] = {
+                "state":     state,
+                "rss_mb":    e.rss_mb,
+                "load_ms":   e.load_ms,
+                "loads":     e.loads,
+                "evictions": e.evictions,
+                "hits":      e.hits,
+                "inferences": e.infer_count,
+                "inference_ms_avg": round(e.infer_ms / e.infer_count, 2) if e.infer_count else None,
+                "inference_ms_last": e.infer_last_ms if e.infer_count else None,
+                "idle_sec":  round(now - e.last_used, 1) if e.last_used else None,
+                "pinned":    e.pinned,
+                "error":     e.error,
+            }
+        return {
+            "budget_mb":       self.budget_mb,
+            "loaded_rss_mb":   self.total_rss_mb(),
+            "process_rss_mb":  round(current_rss_mb(), 1),
+            "models":          models,
+        }
+
+    def _ensure_sweeper(self):
+        if self._sweeper is not None or self.sweep_sec <= 0:
+            return
+        with self._lock:
+            if self._sweeper is not None:
+                return
+
+            def run():
+                while True:
+                    time.sleep(self.sweep_sec)
+                    try:
+                        self.sweep()
+                    except Exception as e:
+                        print(f"⚠️  Model sweep failed: {e}")
+
+            self._sweeper = threading.Thread(target=run, name="model-registry-sweeper", daemon=True)
+            self._sweeper.start()
+
+
+registry = ModelRegistry()
@@ -0,0 +1,293 @@
+"""
+Append-only prediction log.
+
+Entries are queued in memory and drained by a background writer thread
+into ml/logs/predictions.jsonl (one JSON object per line). The request
+thread only pays for a queue put, so latency stays flat no matter how
+large the log grows.
+
+  - bounded queue: when full, new entries are dropped and counted
+  - batched writes: everything queued is written in one go, fsync'd at most
+    every PRED_LOG_FSYNC_SEC seconds
+  - rotation: the active segment is renamed to predictions-<utc>.jsonl once
+    it exceeds PRED_LOG_MAX_BYTES or is older than PRED_LOG_ROTATE_SEC;
+    only the newest PRED_LOG_KEEP segments are kept
+  - migration: a legacy predictions.json array is converted once on start
+"""
+
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+_LOGS_DIR    = os.path.join(os.path.dirname(__file__), "logs")
+LOG_PATH     = os.path.join(_LOGS_DIR, "predictions.jsonl")
+LEGACY_PATH  = os.path.join(_LOGS_DIR, "predictions.json")
+
+QUEUE_SIZE   = int(os.getenv("PRED_LOG_QUEUE_SIZE", "10000"))
+BATCH_MAX    = int(os.getenv("PRED_LOG_BATCH_MAX", "500"))
+FLUSH_SEC    = float(os.getenv("PRED_LOG_FLUSH_SEC", "0.5"))
+FSYNC_SEC    = float(os.getenv("PRED_LOG_FSYNC_SEC", "2.0"))
+MAX_BYTES    = int(os.getenv("PRED_LOG_MAX_BYTES", str(20 * 1024 * 1024)))
+ROTATE_SEC   = float(os.getenv("PRED_LOG_ROTATE_SEC", str(24 * 3600)))
+KEEP         = int(os.getenv("PRED_LOG_KEEP", "10"))
+
+_STOP = object()
+
+
+def migrate_legacy_log(legacy_path: str = LEGACY_PATH, log_path: str = LOG_PATH) -> int:
+    """
+    Convert a legacy JSON-array log into JSONL lines (once).
+    The legacy file is renamed to *.migrated so the migration never repeats.
+    Returns the number of migrated records.
+    """
+    if not os.path.exists(legacy_path):
+        return 0
+    records = []
+    if os.path.getsize(legacy_path) > 2:
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            try:
+                records = json.load(f)
+            except json.JSONDecodeError:
+                records = []
+    if not isinstance(records, list):
+        records = []
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    if records:
+        # Prepend legacy rows so the JSONL stays in chronological order.
+        existing = b""
+        if os.path.exists(log_path):
+            with open(log_path, "rb") as f:
+                existing = f.read()
+        tmp = log_path + ".tmp"
+        with open(tmp, "wb") as f:
+            for rec in records:
+                f.write(_encode(rec))
+            f.write(existing)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, log_path)
+    os.replace(legacy_path, legacy_path + ".migrated")
+    return len(records)
+
+
+def _encode(entry: dict) -> bytes:
+    return (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def segment_paths(log_path: str = LOG_PATH) -> list[str]:
+    """All log segments, oldest first (rotated segments, then the active one)."""
+    base, ext = os.path.splitext(log_path)
+    rotated = sorted(glob.glob(f"{base}-*{ext}"))
+    return rotated + ([log_path] if os.path.exists(log_path) else [])
+
+
+def iter_records(log_path: str = LOG_PATH):
+    """Yield every logged entry across all segments, oldest first."""
+    for path in segment_paths(log_path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn final line after a crash
+
+
+class PredictionLog:
+    """Bounded queue + background writer for prediction entries."""
+
+    def __init__(
+        self,
+        log_path: str = LOG_PATH,
+        queue_size: int = QUEUE_SIZE,
+        batch_max: int = BATCH_MAX,
+        flush_sec: float = FLUSH_SEC,
+        fsync_sec: float = FSYNC_SEC,
+        max_bytes: int = MAX_BYTES,
+        rotate_sec: float = ROTATE_SEC,
+        keep: int = KEEP,
+    ):
+        self.log_path   = log_path
+        self.batch_max  = batch_max
+        self.flush_sec  = flush_sec
+        self.fsync_sec  = fsync_sec
+        self.max_bytes  = max_bytes
+        self.rotate_sec = rotate_sec
+        self.keep       = keep
+
+        self._queue   = queue.Queue(maxsize=queue_size)
+        self._thread  = None
+        self._start_lock = threading.Lock()
+        self._file    = None
+        self._opened_at  = 0.0
+        self._last_fsync = 0.0
+        self._sinks   = []
+
+        self.written  = 0
+        self.dropped  = 0
+        self.errors   = 0
+        self.rotations = 0
+
+    # ── Producer side ────────────────────────────────────────────────────────
+    def add_sink(self, sink):
+        """Register a callable that receives every written batch (list[dict])."""
+        self._sinks.append(sink)
+
+    def log(self, entry: dict) -> bool:
+        """Queue one entry; never blocks. Returns False if the entry was dropped."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self, timeout: float = 5.0):
+        """Flush everything queued and stop the writer thread."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "path":      self.log_path,
+            "queued":    self._queue.qsize(),
+            "written":   self.written,
+            "dropped":   self.dropped,
+            "errors":    self.errors,
+            "rotations": self.rotations,
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="prediction-log-writer", daemon=True,
+            )
+            self._thread.start()
+            atexit.register(self.close)
+
+    # ── Writer thread ────────────────────────────────────────────────────────
+    def _run(self):
+        try:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            legacy = os.path.join(os.path.dirname(self.log_path), os.path.basename(LEGACY_PATH))
+            migrated = migrate_legacy_log(legacy, self.log_path)
+            if migrated:
+                print(f"✅ Migrated {migrated} legacy predictions to {self.log_path}")
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️  Prediction log migration failed: {e}")
+
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_sec)
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            while not stopping and len(batch) < self.batch_max:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+
+            try:
+                if batch:
+                    self._write_batch(batch)
+                self._maybe_fsync(force=stopping)
+                self._maybe_rotate()
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️  Prediction log write failed: {e}")
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.log_path, "ab")
+            if not self._opened_at:
+                self._opened_at = time.time()
+        return self._file
+
+    def _write_batch(self, batch: list):
+        f = self._open()
+        f.write(b"".join(_encode(entry) for entry in batch))
+        f.flush()
+        self.written += len(batch)
+        for sink in self._sinks:
+            try:
+                sink(batch)
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️  Prediction log sink failed: {e}")
+
+    def _maybe_fsync(self, force: bool = False):
+        if self._file is None:
+            return
+        now = time.time()
+        if force or now - self._last_fsync >= self.fsync_sec:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+    def _maybe_rotate(self):
+        if self._file is None:
+            return
+        size = self._file.tell()
+        if size == 0:
+            return
+        too_big = self.max_bytes > 0 and size >= self.max_bytes
+        too_old = self.rotate_sec > 0 and time.time() - self._opened_at >= self.rotate_sec
+        if not (too_big or too_old):
+            return
+
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+        base, ext = os.path.splitext(self.log_path)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        os.replace(self.log_path, f"{base}-{stamp}{ext}")
+        self._opened_at = 0.0
+        self.rotations += 1
+
+        rotated = segment_paths(self.log_path)
+        rotated = [p for p in rotated if p != self.log_path]
+        for old in rotated[: max(0, len(rotated) - self.keep)]:
+            os.remove(old)
+
+
+_default_log = None
+_default_lock = threading.Lock()
+
+
+def get_prediction_log() -> PredictionLog:
+    """Process-wide log instance (created on first use)."""
+    global _default_log
+    if _default_log is None:
+        with _default_lock:
+            if _default_log is None:
+                _default_log = PredictionLog()
+    return _default_log
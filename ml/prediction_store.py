@@ -0,0 +1,310 @@
+"""
+Prediction analytics store (embedded SQLite).
+
+Every entry written by the prediction log is also inserted here, and two
+rollup tables are maintained incrementally in the same transaction:
+
+  rollup_counts   (minute, endpoint, source, emotion) -> n
+  rollup_latency  (minute, endpoint, source, bucket)  -> n
+
+Latency is kept as a log-spaced histogram (~2.5 % relative error), so
+quantiles over any window are computed by merging a few hundred
+histogram rows instead of scanning raw predictions. Raw rows are still
+stored (indexed by timestamp, endpoint, source and emotion) for ad-hoc
+queries.
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+DB_PATH = os.getenv(
+    "PRED_STORE_PATH",
+    os.path.join(os.path.dirname(__file__), "logs", "predictions.db"),
+)
+
+_BUCKET_RATIO = 1.05
+_LOG_RATIO    = math.log(_BUCKET_RATIO)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id           INTEGER PRIMARY KEY,
+    ts           REAL    NOT NULL,
+    endpoint     TEXT    NOT NULL,
+    source       TEXT    NOT NULL,
+    emotion      TEXT    NOT NULL,
+    confidence   REAL,
+    inference_ms REAL,
+    raw          TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_pred_ts       ON predictions(ts);
+CREATE INDEX IF NOT EXISTS idx_pred_endpoint ON predictions(endpoint, ts);
+CREATE INDEX IF NOT EXISTS idx_pred_source   ON predictions(source, ts);
+CREATE INDEX IF NOT EXISTS idx_pred_emotion  ON predictions(emotion, ts);
+
+CREATE TABLE IF NOT EXISTS rollup_counts (
+    minute   INTEGER NOT NULL,
+    endpoint TEXT    NOT NULL,
+    source   TEXT    NOT NULL,
+    emotion  TEXT    NOT NULL,
+    n        INTEGER NOT NULL,
+    PRIMARY KEY (minute, endpoint, source, emotion)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rollup_latency (
+    minute   INTEGER NOT NULL,
+    endpoint TEXT    NOT NULL,
+    source   TEXT    NOT NULL,
+    bucket   INTEGER NOT NULL,
+    n        INTEGER NOT NULL,
+    PRIMARY KEY (minute, endpoint, source, bucket)
+) WITHOUT ROWID;
+"""
+
+GROUP_COLUMNS = ("endpoint", "source", "emotion")
+
+
+def parse_ts(value) -> float:
+    """Epoch seconds from a number or an ISO-8601 string (naive = UTC)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return time.time()
+    text = str(value).replace("Z", "+00:00")
+    dt = datetime.fromisoformat(text)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def latency_bucket(ms: float) -> int:
+    return int(math.log1p(max(0.0, float(ms))) / _LOG_RATIO)
+
+
+def bucket_value(bucket: int) -> float:
+    """Representative latency (ms) for a histogram bucket (its geometric midpoint)."""
+    return math.expm1((bucket + 0.5) * _LOG_RATIO)
+
+
+def _quantiles_from_hist(hist: dict, quantiles) -> dict:
+    total = sum(hist.values())
+    out = {}
+    if total == 0:
+        return {f"p{_q_label(q)}": None for q in quantiles}
+    ordered = sorted(hist.items())
+    for q in quantiles:
+        rank = max(1, math.ceil(q * total))
+        seen = 0
+        for bucket, n in ordered:
+            seen += n
+            if seen >= rank:
+                out[f"p{_q_label(q)}"] = round(bucket_value(bucket), 2)
+                break
+    return out
+
+
+def _q_label(q: float) -> str:
+    label = f"{q * 100:.3f}".rstrip("0").rstrip(".")
+    return label.replace(".", "_")
+
+
+def _row_from_entry(entry: dict):
+    endpoint = str(entry.get("endpoint") or "unknown")
+    # Multimodal entries carry a fusion method + list of modalities instead.
+    source = entry.get("source") or entry.get("fusion_method") or "unknown"
+    return (
+        parse_ts(entry.get("timestamp")),
+        endpoint,
+        str(source),
+        str(entry.get("emotion") or "unknown"),
+        entry.get("confidence"),
+        entry.get("inference_ms"),
+        json.dumps(entry, ensure_ascii=False, separators=(",", ":")),
+    )
+
+
+class PredictionStore:
+    """SQLite-backed prediction store with incrementally maintained rollups."""
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._backfill_checked = False
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ── Writes ───────────────────────────────────────────────────────────────
+    def insert_batch(self, entries: list) -> int:
+        rows = []
+        for entry in entries:
+            try:
+                rows.append(_row_from_entry(entry))
+            except Exception:
+                continue
+        if not rows:
+            return 0
+
+        counts  = {}
+        latency = {}
+        for ts, endpoint, source, emotion, _conf, ms, _raw in rows:
+            minute = int(ts // 60)
+            key = (minute, endpoint, source, emotion)
+            counts[key] = counts.get(key, 0) + 1
+            if ms is not None:
+                lkey = (minute, endpoint, source, latency_bucket(ms))
+                latency[lkey] = latency.get(lkey, 0) + 1
+
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO predictions (ts, endpoint, source, emotion, confidence, inference_ms, raw) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                conn.executemany(
+                    "INSERT INTO rollup_counts (minute, endpoint, source, emotion, n) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(minute, endpoint, source, emotion) DO UPDATE SET n = n + excluded.n",
+                    [(*k, n) for k, n in counts.items()],
+                )
+                conn.executemany(
+                    "INSERT INTO rollup_latency (minute, endpoint, source, bucket, n) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(minute, endpoint, source, bucket) DO UPDATE SET n = n + excluded.n",
+                    [(*k, n) for k, n in latency.items()],
+                )
+        return len(rows)
+
+    def is_empty(self) -> bool:
+        return self._conn().execute("SELECT 1 FROM predictions LIMIT 1").fetchone() is None
+
+    def as_log_sink(self, log_path: str):
+        """
+        Return a PredictionLog sink. On the first batch an empty store is
+        backfilled from the JSONL segments (which already contain that batch).
+        """
+        from ml.prediction_log import iter_records
+
+        def sink(batch):
+            if not self._backfill_checked:
+                self._backfill_checked = True
+                if self.is_empty():
+                    chunk = []
+                    for rec in iter_records(log_path):
+                        chunk.append(rec)
+                        if len(chunk) >= 1000:
+                            self.insert_batch(chunk)
+                            chunk = []
+                    self.insert_batch(chunk)
+                    return
+            self.insert_batch(batch)
+
+        return sink
+
+    # ── Queries ──────────────────────────────────────────────────────────────
+    def query(
+        self,
+        since: float,
+        until: float | None = None,
+        endpoint: str | None = None,
+        source: str | None = None,
+        emotion: str | None = None,
+        group_by: str | None = None,
+        quantiles=(0.5, 0.95, 0.99),
+    ) -> dict:
+        """
+        Aggregate over [since, until) at minute resolution using the rollups only:
+        every minute bucket that overlaps the interval is included, so an
+        hour aligned to the minute covers exactly 60 buckets.
+        Returns counts per emotion/source and latency quantiles, optionally
+        grouped by endpoint, source or emotion.
+        """
+        if group_by is not None and group_by not in GROUP_COLUMNS:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_COLUMNS)}")
+        until = time.time() if until is None else until
+        lo, hi = int(since // 60), math.ceil(until / 60)  # hi is exclusive
+
+        where  = ["minute >= ?", "minute < ?"]
+        params = [lo, hi]
+        for col, val in (("endpoint", endpoint), ("source", source)):
+            if val:
+                where.append(f"{col} = ?")
+                params.append(val)
+        count_where, count_params = list(where), list(params)
+        if emotion:
+            count_where.append("emotion = ?")
+            count_params.append(emotion)
+
+        conn = self._conn()
+        by_emotion, by_source, total = {}, {}, 0
+        for emo, src, n in conn.execute(
+            f"SELECT emotion, source, SUM(n) FROM rollup_counts WHERE {' AND '.join(count_where)} "
+            "GROUP BY emotion, source",
+            count_params,
+        ):
+            by_emotion[emo] = by_emotion.get(emo, 0) + n
+            by_source[src]  = by_source.get(src, 0) + n
+            total += n
+
+        latency = {}
+        if group_by == "emotion" or emotion:
+            # Latency histograms are not split by emotion; only counts are.
+            latency = None
+        else:
+            group_col = group_by or "'all'"
+            hists = {}
+            for group, bucket, n in conn.execute(
+                f"SELECT {group_col}, bucket, SUM(n) FROM rollup_latency WHERE {' AND '.join(where)} "
+                f"GROUP BY {group_col}, bucket",
+                params,
+            ):
+                hists.setdefault(group, {})[bucket] = n
+            for group, hist in hists.items():
+                latency[group] = {"count": sum(hist.values()), **_quantiles_from_hist(hist, quantiles)}
+
+        grouped_counts = None
+        if group_by:
+            grouped_counts = {}
+            for group, emo, n in conn.execute(
+                f"SELECT {group_by}, emotion, SUM(n) FROM rollup_counts WHERE {' AND '.join(count_where)} "
+                f"GROUP BY {group_by}, emotion",
+                count_params,
+            ):
+                grouped_counts.setdefault(group, {})[emo] = n
+
+        return {
+            "total":      total,
+            "by_emotion": dict(sorted(by_emotion.items(), key=lambda x: -x[1])),
+            "by_source":  dict(sorted(by_source.items(), key=lambda x: -x[1])),
+            "grouped":    grouped_counts,
+            "latency_ms": latency,
+        }
+
+
+_default_store = None
+_default_lock  = threading.Lock()
+
+
+def get_prediction_store() -> PredictionStore:
+    """Process-wide store instance (created on first use)."""
+    global _default_store
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                _default_store = PredictionStore()
+    return _default_store
@@ -10,84 +10,128 @@ Priority:
 
 import os
 import re
+import time
+from ml.batcher import MicroBatcher
+from ml.circuit_breaker import CircuitBreaker, CircuitOpen
+from ml.keyword_scorer import score_text
+from ml.model_registry import registry
+from ml.timing import elapsed_ms
 
 # ── Model paths ───────────────────────────────────────────────────────────────
-_MODEL_DIR  = os.path.join(os.path.dirname(__file__), "models")
-_HF_PATH    = os.path.join(_MODEL_DIR, "text_emotion_model")      # fine-tuned
-_SKL_PATH   = os.path.join(_MODEL_DIR, "text_emotion_model.pkl")   # sklearn
-
-# ── Fine-tuned DistilBERT (lazy load) ─────────────────────────────────────────
-_hf_pipeline  = None
-_hf_error     = None
-_hf_labels    = None
-
-def _load_hf_model():
-    global _hf_pipeline, _hf_error, _hf_labels
-    if _hf_pipeline is not None or _hf_error is not None:
-        return _hf_pipeline
-    labels_json = os.path.join(_HF_PATH, "echona_labels.json")
-    if not os.path.isdir(_HF_PATH):
-        _hf_error = f"Fine-tuned model not found at {_HF_PATH}"
-        return None
+_MODEL_DIR    = os.path.join(os.path.dirname(__file__), "models")
+_HF_PATH      = os.path.join(_MODEL_DIR, "text_emotion_model")       # fine-tuned
+_HF_INT8_PATH = os.path.join(_MODEL_DIR, "text_emotion_model_int8")  # quantized copy
+_SKL_PATH     = os.path.join(_MODEL_DIR, "text_emotion_model.pkl")   # sklearn
+
+# fp32: the fine-tuned model as trained
+# int8: dynamically quantized copy from `python -m ml.convert_text_model`
+#       (falls back to fp32 when it has not been exported)
+TEXT_RUNTIME = os.getenv("TEXT_RUNTIME", "fp32").lower()
+INT8_WEIGHTS = "quantized_state_dict.pt"
+
+# Transformer batching: texts per forward pass, and the cross-request
+# batcher's gather limits (TEXT_HF_BATCH_MAX=1 disables it).
+HF_BATCH_SIZE    = int(os.getenv("TEXT_HF_BATCH_SIZE", "32"))
+HF_BATCH_MAX     = int(os.getenv("TEXT_HF_BATCH_MAX", "32"))
+HF_BATCH_WAIT_MS = float(os.getenv("TEXT_HF_BATCH_WAIT_MS", "8"))
+
+# Long texts on the transformer tiers: split on sentence boundaries into
+# chunks of at most TEXT_CHUNK_TOKENS tokens (≤ TEXT_MAX_CHUNKS, spread over
+# the document), score them in one batched call and average the chunk
+# scores weighted by token count. TEXT_EARLY_EXIT_CONF > 0 scores chunks in
+# waves and stops once the running average is that confident.
+LONG_TEXT       = os.getenv("TEXT_LONG_MODE", "1").lower() not in ("0", "false", "no")
+CHUNK_TOKENS    = min(int(os.getenv("TEXT_CHUNK_TOKENS", "256")), 510)
+MAX_CHUNKS      = max(1, int(os.getenv("TEXT_MAX_CHUNKS", "16")))
+EARLY_EXIT_CONF = float(os.getenv("TEXT_EARLY_EXIT_CONF", "0"))
+EARLY_EXIT_WAVE = 4
+
+# quality → first cascade tier tried; the tiers after it remain fallbacks,
+# minus QUALITY_SKIP (balanced never falls through to a transformer).
+QUALITY_START = {"best": "fine_tuned", "balanced": "sklearn", "fast": "keyword"}
+QUALITY_SKIP  = {"balanced": ("pretrained_hf",)}
+_TIERS = ("fine_tuned", "sklearn", "pretrained_hf", "keyword")
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+_HF_MAP = {
+    "joy": "Happy", "sadness": "Sad", "anger": "Angry",
+    "fear": "Anxious", "surprise": "Excited",
+    "neutral": "Neutral", "disgust": "Angry",
+}
+
+# ── Fine-tuned DistilBERT (lazy load via ml.model_registry) ──────────────────
+def _quantized_model(path: str):
+    """Rebuild the int8 model written by `python -m ml.convert_text_model`."""
+    import torch  # type: ignore
+    from transformers import AutoConfig, AutoModelForSequenceClassification  # type: ignore
+
+    model = AutoModelForSequenceClassification.from_config(AutoConfig.from_pretrained(path))
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.load_state_dict(torch.load(os.path.join(path, INT8_WEIGHTS), map_location="cpu"))
+    return model.eval()
+
+
+def _build_hf_model():
+    path = _HF_PATH
+    if TEXT_RUNTIME == "int8":
+        if os.path.isdir(_HF_INT8_PATH):
+            path = _HF_INT8_PATH
+        else:
+            print(f"⚠️  TEXT_RUNTIME=int8 but {_HF_INT8_PATH} is missing — "
+                  f"run python -m ml.convert_text_model; serving fp32")
+    labels_json = os.path.join(path, "echona_labels.json")
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Fine-tuned model not found at {path}")
     try:
         from transformers import pipeline as hf_pipeline  # type: ignore
         import json
-        _hf_pipeline = hf_pipeline(
-            "text-classification", model=_HF_PATH,
+        if path == _HF_INT8_PATH:
+            from transformers import AutoTokenizer  # type: ignore
+            model, tokenizer = _quantized_model(path), AutoTokenizer.from_pretrained(path)
+        else:
+            model, tokenizer = path, None
+        pipe = hf_pipeline(
+            "text-classification", model=model, tokenizer=tokenizer,
             return_all_scores=True, top_k=None,
         )
+        labels = None
         if os.path.exists(labels_json):
             with open(labels_json) as f:
-                _hf_labels = json.load(f)["labels"]
-        print(f"✅ Fine-tuned text model loaded from {_HF_PATH}")
+                labels = json.load(f)["labels"]
+        runtime = "int8" if path == _HF_INT8_PATH else "fp32"
+        print(f"✅ Fine-tuned text model loaded from {path} ({runtime})")
     except Exception as e:
-        _hf_error = str(e)
         print(f"⚠️  Fine-tuned text model unavailable: {e}")
-    return _hf_pipeline
+        raise
+    return {"pipeline": pipe, "labels": labels, "runtime": runtime}
 
-# ── Sklearn TF-IDF model (lazy load) ──────────────────────────────────────────
-_skl_payload = None
-_skl_error   = None
 
-def _load_skl_model():
-    global _skl_payload, _skl_error
-    if _skl_payload is not None or _skl_error is not None:
-        return _skl_payload
+def _load_hf_model():
+    payload = registry.get("text_fine_tuned")
+    return payload["pipeline"] if payload else None
+
+# ── Sklearn TF-IDF model (lazy load via ml.model_registry) ────────────────────
+def _build_skl_model():
     if not os.path.exists(_SKL_PATH):
-        _skl_error = f"Sklearn model not found at {_SKL_PATH}"
-        return None
+        raise FileNotFoundError(f"Sklearn model not found at {_SKL_PATH}")
     try:
         import joblib  # type: ignore
-        _skl_payload = joblib.load(_SKL_PATH)
+        payload = joblib.load(_SKL_PATH)
         print(f"✅ Text sklearn model loaded from {_SKL_PATH}")
     except Exception as e:
-        _skl_error = str(e)
         print(f"⚠️  Text sklearn model unavailable: {e}")
-    return _skl_payload
+        raise
+    return payload
 
-# ── Pretrained HuggingFace pipeline (lazy load, original behaviour) ───────────
-_classifier = None
-_classifier_error = None
-
-_LONELY_PATTERNS = [
-    r"\blonely\b",
-    r"\balone\b",
-    r"\bisolated\b",
-    r"\bno one\b",
-    r"\bnobody\b",
-    r"\bleft out\b",
-    r"\bdisconnected\b",
-    r"\bfeel unseen\b",
-    r"\babandoned\b",
-]
 
+def _load_skl_model():
+    return registry.get("text_sklearn")
+
+# ── Pretrained HuggingFace pipeline (lazy load, original behaviour) ───────────
 
 def _lonely_signal_score(text: str) -> int:
-    text_lower = text.lower()
-    score = 0
-    for pattern in _LONELY_PATTERNS:
-        score += len(re.findall(pattern, text_lower))
-    return score
+    return score_text(text)["lonely_hits"]
 
 
 def _apply_lonely_relabel(
@@ -137,83 +181,191 @@ def _apply_lonely_relabel(
 
     return emotion, confidence, False
 
-def get_classifier():
-    """Try to load pretrained transformers pipeline."""
-    global _classifier, _classifier_error
-    if _classifier is not None:
-        return _classifier
-    if _classifier_error is not None:
-        return None
+def _build_classifier():
     try:
         from transformers import pipeline  # type: ignore
-        _classifier = pipeline(
+        classifier = pipeline(
             "text-classification",
             model="j-hartmann/emotion-english-distilroberta-base",
-            return_all_scores=False,
+            top_k=None,  # full distributions, so chunk scores average like the fine-tuned tier's
         )
         print("✅ Pretrained transformers pipeline loaded")
-        return _classifier
+        return classifier
     except Exception as e:
-        _classifier_error = str(e)
         print(f"⚠️ Transformers unavailable: {e}")
+        raise
+
+
+def get_classifier():
+    """Try to load pretrained transformers pipeline."""
+    return registry.get("text_pretrained_hf")
+
+
+registry.register("text_fine_tuned", _build_hf_model)
+registry.register("text_sklearn", _build_skl_model)
+registry.register("text_pretrained_hf", _build_classifier)
+
+
+# ── Batched transformer inference ─────────────────────────────────────────────
+def _run_sorted(pipe, texts: list) -> list:
+    """
+    pipe(texts) in forward passes of HF_BATCH_SIZE, with the texts ordered by
+    token length so each pass pads to a similar length; outputs are returned
+    in the original order.
+    """
+    try:
+        lengths = [len(ids) for ids in pipe.tokenizer(texts, truncation=True)["input_ids"]]
+    except Exception:
+        lengths = [len(t) for t in texts]
+    order   = sorted(range(len(texts)), key=lengths.__getitem__)
+    outputs = pipe([texts[i] for i in order], batch_size=HF_BATCH_SIZE, truncation=True)
+    results = [None] * len(texts)
+    for i, out in zip(order, outputs):
+        results[i] = out
+    return results
+
+
+def _fine_tuned_batch(texts: list) -> list:
+    pipe = _load_hf_model()
+    if pipe is None:
+        raise RuntimeError("Fine-tuned text model unavailable")
+    start = time.perf_counter()
+    outputs = _run_sorted(pipe, texts)
+    registry.record_inference("text_fine_tuned", elapsed_ms(start), items=len(texts))
+    return outputs
+
+
+def _pretrained_batch(texts: list) -> list:
+    clf = get_classifier()
+    if clf is None:
+        raise RuntimeError("Pretrained text pipeline unavailable")
+    start = time.perf_counter()
+    # Some transformers versions wrap each text's [{label, score}, ...] once more.
+    outputs = [out[0] if out and isinstance(out[0], list) else out for out in _run_sorted(clf, texts)]
+    registry.record_inference("text_pretrained_hf", elapsed_ms(start), items=len(texts))
+    return outputs
+
+
+# Texts from concurrent /detect-text, /analyze and /detect-multimodal calls
+# share one pipeline call per tier.
+_fine_tuned_batcher = MicroBatcher("text_fine_tuned", _fine_tuned_batch,
+                                   max_batch=HF_BATCH_MAX, max_wait_ms=HF_BATCH_WAIT_MS)
+_pretrained_batcher = MicroBatcher("text_pretrained_hf", _pretrained_batch,
+                                   max_batch=HF_BATCH_MAX, max_wait_ms=HF_BATCH_WAIT_MS)
+
+
+# Inference failures per tier trip a breaker so the cascade skips that tier
+# for a cool-down instead of re-trying it on every request.
+_fine_tuned_breaker = CircuitBreaker("text_fine_tuned")
+_sklearn_breaker    = CircuitBreaker("text_sklearn")
+_pretrained_breaker = CircuitBreaker("text_pretrained_hf")
+
+
+def _fine_tuned_many(texts: list) -> list:
+    """[{label, score}, ...] from the fine-tuned model for each text."""
+    if _fine_tuned_batcher.max_batch > 1:
+        return _fine_tuned_breaker.call(_fine_tuned_batcher.submit_many, texts)
+    return _fine_tuned_breaker.call(_fine_tuned_batch, texts)
+
+
+def _pretrained_many(texts: list) -> list:
+    """[{label, score}, ...] from the pretrained pipeline for each text."""
+    if _pretrained_batcher.max_batch > 1:
+        return _pretrained_breaker.call(_pretrained_batcher.submit_many, texts)
+    return _pretrained_breaker.call(_pretrained_batch, texts)
+
+
+# ── Long texts ────────────────────────────────────────────────────────────────
+def _chunks(tokenizer, text: str) -> list:
+    """[(chunk_text, n_tokens)] packed from whole sentences, capped at MAX_CHUNKS."""
+    sentences = [s.strip() for s in _SENTENCE_RE.split(text) if s and s.strip()]
+    if not sentences:
+        return []
+    ids = tokenizer(sentences, add_special_tokens=False)["input_ids"]
+
+    chunks, current, size = [], [], 0
+    for sentence, sent_ids in zip(sentences, ids):
+        if current and size + len(sent_ids) > CHUNK_TOKENS:
+            chunks.append((" ".join(current), size))
+            current, size = [], 0
+        if len(sent_ids) > CHUNK_TOKENS:
+            # A single overlong sentence is cut at the token budget.
+            for i in range(0, len(sent_ids), CHUNK_TOKENS):
+                piece = sent_ids[i:i + CHUNK_TOKENS]
+                chunks.append((tokenizer.decode(piece), len(piece)))
+            continue
+        current.append(sentence)
+        size += len(sent_ids)
+    if current:
+        chunks.append((" ".join(current), size))
+
+    if len(chunks) > MAX_CHUNKS:
+        step = (len(chunks) - 1) / max(MAX_CHUNKS - 1, 1)
+        chunks = [chunks[round(i * step)] for i in range(MAX_CHUNKS)]
+    return chunks
+
+
+def _chunk_plan(text: str, tokenizer) -> list:
+    """[(piece, weight)] to score for text: its chunks when it is long, else [(text, 1)]."""
+    # Every token covers at least one character, so short texts skip tokenizing.
+    if LONG_TEXT and tokenizer is not None and len(text) > CHUNK_TOKENS:
+        chunks = _chunks(tokenizer, text)
+        if len(chunks) > 1:
+            return chunks
+    return [(text, 1)]
+
+
+def _weighted_scores(chunks: list, outputs: list) -> dict:
+    """{label: score} averaged over per-chunk pipeline outputs, weighted by token count."""
+    totals, weight = {}, 0
+    for (_, n_tokens), out in zip(chunks, outputs):
+        for entry in out:
+            totals[entry["label"]] = totals.get(entry["label"], 0.0) + n_tokens * float(entry["score"])
+        weight += n_tokens
+    return {label: total / weight for label, total in totals.items()}
+
+
+def _chunked_scores(text: str, tokenizer, run_many):
+    """
+    ({label: score}, chunks_scored) averaged over the chunks of `text`,
+    weighted by token count; None when the text fits in one chunk.
+    """
+    chunks = _chunk_plan(text, tokenizer)
+    if len(chunks) <= 1:
         return None
 
+    wave = EARLY_EXIT_WAVE if EARLY_EXIT_CONF > 0 else len(chunks)
+    outputs = []
+    for i in range(0, len(chunks), wave):
+        outputs += run_many([c for c, _ in chunks[i:i + wave]])
+        scores = _weighted_scores(chunks, outputs)
+        if EARLY_EXIT_CONF > 0 and max(scores.values()) >= EARLY_EXIT_CONF:
+            break
+    return scores, len(outputs)
+
+
+def _plan_batch(texts: list, tokenizer) -> tuple:
+    """(chunk plan per text, every piece flattened) for one batched pipeline call."""
+    plans = [_chunk_plan(text, tokenizer) for text in texts]
+    return plans, [piece for plan in plans for piece, _ in plan]
+
+
+def _split_batch(plans: list, outputs: list):
+    """Yield (output, chunks) per text from a flattened _plan_batch call; chunks is None for short texts."""
+    pos = 0
+    for plan in plans:
+        part = outputs[pos:pos + len(plan)]
+        pos += len(plan)
+        if len(plan) == 1:
+            yield part[0], None
+        else:
+            yield [{"label": l, "score": p} for l, p in _weighted_scores(plan, part).items()], len(plan)
+
 
 def analyze_text_emotion_simple(text):
     """Enhanced keyword-based emotion detection covering all 10 moods."""
-    text_lower = text.lower()
-
-    emotion_patterns = {
-        "Happy":   [
-            (r'\b(happy|joy|joyful|delighted|cheerful|wonderful|amazing|fantastic|great|awesome|love|loved|loving|grateful|bliss)\b', 2),
-            (r'\b(good|nice|pleasant|lovely|enjoy|glad|pleased)\b', 1),
-            (r'(😊|😄|😃|🙂|😁|🥰|❤️|💕)', 2),
-        ],
-        "Sad": [
-            (r'\b(sad|depressed|unhappy|miserable|upset|down|heartbroken|crying|cry|tears|grief|sorrow|hopeless)\b', 2),
-            (r'\b(disappointed|pessimistic|gloomy|despair|broken)\b', 1),
-            (r'(😢|😭|😔|☹️|😞)', 2),
-        ],
-        "Angry": [
-            (r'\b(angry|mad|furious|rage|outraged|irritated|annoyed|frustrated|hate|hatred|disgust)\b', 2),
-            (r'\b(pissed|aggravated|bitter|resentful)\b', 1),
-            (r'(😠|😡|🤬|😤)', 2),
-        ],
-        "Anxious": [
-            (r'\b(anxious|worried|nervous|panic|fear|scared|afraid|terrified|uneasy|apprehensive)\b', 2),
-            (r'\b(uncertain|concerned|dread|phobia)\b', 1),
-            (r'(😰|😨|😱|😟|😧)', 2),
-        ],
-        "Stressed": [
-            (r'\b(stressed|overwhelmed|pressure|burnout|tense|overloaded|deadline|exhausting|chaotic)\b', 2),
-            (r'\b(swamped|buried|frantic|hectic)\b', 1),
-        ],
-        "Lonely": [
-            (r'\b(lonely|alone|isolated|miss|abandoned|disconnected|left out|no one|nobody)\b', 2),
-            (r'\b(forgotten|invisible|unwanted)\b', 1),
-        ],
-        "Tired": [
-            (r'\b(tired|exhausted|sleepy|fatigued|drained|bored|boring|monoton|lethargic|weary|burnt out)\b', 2),
-            (r'\b(numb|flat|meh|blah|sluggish)\b', 1),
-        ],
-        "Excited": [
-            (r'\b(excited|thrilled|enthusiastic|eager|pumped|energized|motivated|hyped|stoked)\b', 2),
-            (r'\b(can.t wait|looking forward|incredible|unbelievable)\b', 1),
-            (r'(🎉|🎊|🥳|🤩|✨)', 2),
-        ],
-        "Calm": [
-            (r'\b(calm|peaceful|relaxed|serene|tranquil|content|satisfied|comfortable|okay|fine|alright|steady)\b', 2),
-            (r'(😌|🙏|🧘)', 2),
-        ],
-        "Neutral": [
-            (r'\b(neutral|normal|nothing|just|whatever|idk|hmm|so so|meh)\b', 1),
-        ],
-    }
-
-    scores = {e: 0 for e in emotion_patterns}
-    for emotion, patterns in emotion_patterns.items():
-        for pattern, weight in patterns:
-            scores[emotion] += len(re.findall(pattern, text_lower)) * weight
+    # One precompiled scan for all moods (ml/keyword_scorer.py).
+    scores = score_text(text)["moods"]
 
     max_score = max(scores.values())
     if max_score == 0:
@@ -221,12 +373,19 @@ def analyze_text_emotion_simple(text):
     return max(scores, key=scores.get)
 
 
-def analyze_text_emotion(text: str) -> str:
+def _tiers(quality: str) -> tuple:
+    if quality not in QUALITY_START:
+        raise ValueError(f"Unknown quality {quality!r} (expected fast, balanced or best)")
+    skip = QUALITY_SKIP.get(quality, ())
+    return tuple(t for t in _TIERS[_TIERS.index(QUALITY_START[quality]):] if t not in skip)
+
+
+def analyze_text_emotion(text: str, quality: str = "best") -> str:
     """Return mood string. Use analyze_text_emotion_full() for confidence."""
-    return analyze_text_emotion_full(text)["emotion"]
+    return analyze_text_emotion_full(text, quality=quality)["emotion"]
 
 
-def analyze_text_emotion_full(text: str) -> dict:
+def analyze_text_emotion_full(text: str, quality: str = "best") -> dict:
     """
     Return dict with emotion, confidence, source.
 
@@ -235,15 +394,26 @@ def analyze_text_emotion_full(text: str) -> dict:
       2. Trained sklearn model  (ml/models/text_emotion_model.pkl)
       3. Pretrained HF pipeline (j-hartmann/emotion-english-distilroberta-base)
       4. Keyword heuristic
+
+    quality="balanced" runs only the sklearn model and the keywords, "fast"
+    only the keywords.
+
+    Texts longer than TEXT_CHUNK_TOKENS are scored chunk by chunk on the
+    transformer tiers (see _chunked_scores); the result then has "chunks".
     """
+    tiers = _tiers(quality)
     if not text or not text.strip():
         return {"emotion": "Neutral", "confidence": 0.0, "source": "empty"}
 
     # 1️⃣  Fine-tuned DistilBERT
-    pipe = _load_hf_model()
+    pipe = _load_hf_model() if "fine_tuned" in tiers else None
     if pipe is not None:
         try:
-            scores = pipe(text[:512])[0]  # list of {label, score}
+            chunked = _chunked_scores(text, getattr(pipe, "tokenizer", None), _fine_tuned_many)
+            if chunked:
+                scores = [{"label": l, "score": p} for l, p in chunked[0].items()]
+            else:
+                scores = _fine_tuned_many([text])[0]  # list of {label, score}; pipeline truncates
             best   = max(scores, key=lambda x: x["score"])
             label  = best["label"]
             conf   = float(best["score"])
@@ -253,18 +423,21 @@ def analyze_text_emotion_full(text: str) -> dict:
                 "emotion": label,
                 "confidence": conf,
                 "source": "fine_tuned+postrule_lonely" if adjusted else "fine_tuned",
+                **({"chunks": chunked[1]} if chunked else {}),
             }
+        except CircuitOpen:
+            pass
         except Exception as e:
             print(f"⚠️  Fine-tuned inference failed: {e}")
 
     # 2️⃣  Sklearn TF-IDF model
-    payload = _load_skl_model()
+    payload = _load_skl_model() if "sklearn" in tiers else None
     if payload is not None:
         try:
             import numpy as np
             model  = payload["model"]
             labels = payload["labels"]
-            probs  = model.predict_proba([text])[0]
+            probs  = _sklearn_breaker.call(model.predict_proba, [text])[0]
             idx    = int(np.argmax(probs))
             emotion, conf = labels[idx], float(probs[idx])
             emotion, conf, adjusted = _apply_lonely_relabel(
@@ -281,21 +454,23 @@ def analyze_text_emotion_full(text: str) -> dict:
                 "confidence": conf,
                 "source": "sklearn+postrule_lonely" if adjusted else "sklearn",
             }
+        except CircuitOpen:
+            pass
         except Exception as e:
             print(f"⚠️  Sklearn inference failed: {e}")
 
     # 3️⃣  Pretrained HuggingFace pipeline
     try:
-        clf = get_classifier()
+        clf = get_classifier() if "pretrained_hf" in tiers else None
         if clf is not None:
-            result  = clf(text)[0]
+            chunked = _chunked_scores(text, getattr(clf, "tokenizer", None), _pretrained_many)
+            if chunked:
+                scores = [{"label": l, "score": p} for l, p in chunked[0].items()]
+            else:
+                scores = _pretrained_many([text])[0]
+            result  = max(scores, key=lambda x: x["score"])
             raw     = result["label"].lower()
-            hf_map  = {
-                "joy": "Happy", "sadness": "Sad", "anger": "Angry",
-                "fear": "Anxious", "surprise": "Excited",
-                "neutral": "Neutral", "disgust": "Angry",
-            }
-            emotion = hf_map.get(raw, "Neutral")
+            emotion = _HF_MAP.get(raw, "Neutral")
             conf    = float(result.get("score", 0.5))
             emotion, conf, adjusted = _apply_lonely_relabel(text, emotion, conf, "pretrained_hf")
             print(f"✅ Text (pretrained HF): {raw} → {emotion} ({conf:.2f})")
@@ -303,7 +478,10 @@ def analyze_text_emotion_full(text: str) -> dict:
                 "emotion": emotion,
                 "confidence": conf,
                 "source": "pretrained_hf+postrule_lonely" if adjusted else "pretrained_hf",
+                **({"chunks": chunked[1]} if chunked else {}),
             }
+    except CircuitOpen:
+        pass
     except Exception as e:
         print(f"⚠️  Pretrained HF failed: {e}")
 
@@ -312,3 +490,99 @@ def analyze_text_emotion_full(text: str) -> dict:
     print(f"✅ Text (keyword): {emotion}")
     return {"emotion": emotion, "confidence": 0.4, "source": "keyword"}
 
+
+def analyze_text_emotion_batch(texts: list, quality: str = "best") -> list:
+    """
+    Batched analyze_text_emotion_full(): one {emotion, confidence, source}
+    per text, in order. Each tier scores every text still unresolved in a
+    single call (HF pipelines length-sorted in passes of
+    TEXT_HF_BATCH_SIZE, one vectorised sklearn predict_proba); texts a
+    tier cannot handle fall through to the next one, as in the
+    single-text cascade. Long texts are split into chunks as in
+    analyze_text_emotion_full(), scored in the same pipeline call as the
+    rest of the batch (no early exit), and carry "chunks".
+    """
+    tiers   = _tiers(quality)
+    results = [None] * len(texts)
+    pending = []
+    for i, text in enumerate(texts):
+        if not text or not str(text).strip():
+            results[i] = {"emotion": "Neutral", "confidence": 0.0, "source": "empty"}
+        else:
+            pending.append(i)
+
+    # 1️⃣  Fine-tuned DistilBERT
+    pipe = _load_hf_model() if pending and "fine_tuned" in tiers else None
+    if pipe is not None:
+        try:
+            plans, pieces = _plan_batch([texts[i] for i in pending], getattr(pipe, "tokenizer", None))
+            outputs = _fine_tuned_breaker.call(_fine_tuned_batch, pieces)
+            for i, (scores, chunks) in zip(pending, _split_batch(plans, outputs)):
+                best = max(scores, key=lambda x: x["score"])
+                label, conf, adjusted = _apply_lonely_relabel(texts[i], best["label"], float(best["score"]), "fine_tuned")
+                results[i] = {
+                    "emotion": label,
+                    "confidence": conf,
+                    "source": "fine_tuned+postrule_lonely" if adjusted else "fine_tuned",
+                    **({"chunks": chunks} if chunks else {}),
+                }
+            pending = []
+        except CircuitOpen:
+            pass
+        except Exception as e:
+            print(f"⚠️  Fine-tuned batch inference failed: {e}")
+
+    # 2️⃣  Sklearn TF-IDF model
+    payload = _load_skl_model() if pending and "sklearn" in tiers else None
+    if payload is not None:
+        try:
+            import numpy as np
+            model  = payload["model"]
+            labels = payload["labels"]
+            probs  = _sklearn_breaker.call(model.predict_proba, [texts[i] for i in pending])
+            for i, row in zip(pending, probs):
+                idx = int(np.argmax(row))
+                emotion, conf, adjusted = _apply_lonely_relabel(
+                    texts[i], labels[idx], float(row[idx]), "sklearn", labels=labels, probs=row,
+                )
+                results[i] = {
+                    "emotion": emotion,
+                    "confidence": conf,
+                    "source": "sklearn+postrule_lonely" if adjusted else "sklearn",
+                }
+            pending = []
+        except CircuitOpen:
+            pass
+        except Exception as e:
+            print(f"⚠️  Sklearn batch inference failed: {e}")
+
+    # 3️⃣  Pretrained HuggingFace pipeline
+    clf = get_classifier() if pending and "pretrained_hf" in tiers else None
+    if clf is not None:
+        try:
+            plans, pieces = _plan_batch([texts[i] for i in pending], getattr(clf, "tokenizer", None))
+            outputs = _pretrained_breaker.call(_pretrained_batch, pieces)
+            for i, (scores, chunks) in zip(pending, _split_batch(plans, outputs)):
+                result  = max(scores, key=lambda x: x["score"])
+                emotion = _HF_MAP.get(result["label"].lower(), "Neutral")
+                emotion, conf, adjusted = _apply_lonely_relabel(
+                    texts[i], emotion, float(result.get("score", 0.5)), "pretrained_hf",
+                )
+                results[i] = {
+                    "emotion": emotion,
+                    "confidence": conf,
+                    "source": "pretrained_hf+postrule_lonely" if adjusted else "pretrained_hf",
+                    **({"chunks": chunks} if chunks else {}),
+                }
+            pending = []
+        except CircuitOpen:
+            pass
+        except Exception as e:
+            print(f"⚠️  Pretrained HF batch failed: {e}")
+
+    # 4️⃣  Keyword fallback
+    for i in pending:
+        results[i] = {"emotion": analyze_text_emotion_simple(texts[i]), "confidence": 0.4, "source": "keyword"}
+
+    print(f"✅ Text batch: {len(texts)} texts")
+    return results
@@ -0,0 +1,8 @@
+"""Shared helper for the per-stage timings the ml modules report."""
+
+import time
+
+
+def elapsed_ms(start: float) -> float:
+    """Milliseconds since a time.perf_counter() start, rounded to 0.01."""
+    return round((time.perf_counter() - start) * 1000, 2)
@@ -4,109 +4,348 @@ Voice emotion analysis.
 Priority:
   1. Trained sklearn model (ml/models/voice_emotion_model.pkl)
   2. Librosa energy heuristic fallback
+
+The upload is decoded once. The model reads the first 3 s. The heuristic
+reads at most VOICE_HEURISTIC_WINDOW_SEC, decimated to
+VOICE_HEURISTIC_SR, so its cost stays bounded for long recordings.
+
+Before either tier runs, an energy VAD trims leading and trailing
+silence. The model then scores the most voiced 3 s window. Uploads with no
+speech at all return a "no_speech" result without feature extraction.
+
+analyze_voice_timeline() scores a whole recording instead. It decodes and
+runs the VAD in a voice worker (ml/voice_pool.py), cuts overlapping 3 s
+windows, extracts their features split across the pool (inline below
+VOICE_POOL_MIN_WINDOWS windows or with a single worker), and scores every
+window in one predict_proba call.
 """
 
 import os
+import time
 import numpy as np
+from ml.audio_io import load_audio
+from ml.model_registry import registry
+from ml.timing import elapsed_ms
+from ml.voice_features import feature_matrix, feature_vector, warm_up as warm_up_features
+from ml.voice_pool import get_voice_pool
 
-# ── Model loading (once at startup) ───────────────────────────────────────────
-_MODEL_PAYLOAD = None
-_MODEL_ERR     = None
-
+# ── Model loading (once, owned by ml.model_registry) ──────────────────────────
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "models", "voice_emotion_model.pkl")
 
-N_MFCC  = 40
-N_MELS  = 128
-HOP_LEN = 512
+SR                   = 22050
+CLIP_SEC             = 3.0
+HEURISTIC_WINDOW_SEC = float(os.getenv("VOICE_HEURISTIC_WINDOW_SEC", "30"))
+HEURISTIC_SR         = int(os.getenv("VOICE_HEURISTIC_SR", "11025"))
 
+VAD_ENABLED          = os.getenv("VOICE_VAD", "1").lower() not in ("0", "false", "no")
+VAD_MIN_RMS          = float(os.getenv("VOICE_VAD_MIN_RMS", "0.005"))
+VAD_REL_DB           = float(os.getenv("VOICE_VAD_REL_DB", "35"))
+VAD_FRAME            = 512
+VAD_HANGOVER         = 4  # frames kept either side of speech (~90 ms)
 
-def _load_model():
-    global _MODEL_PAYLOAD, _MODEL_ERR
-    if _MODEL_PAYLOAD is not None or _MODEL_ERR is not None:
-        return _MODEL_PAYLOAD
+# quality → first tier tried ("fast" = heuristic on one CLIP_SEC window)
+QUALITY_START        = {"best": "trained_model", "balanced": "trained_model", "fast": "heuristic"}
+
+TIMELINE_HOP_SEC     = float(os.getenv("VOICE_TIMELINE_HOP_SEC", "1.5"))
+TIMELINE_MAX_SEC     = float(os.getenv("VOICE_TIMELINE_MAX_SEC", "600"))
+# Fewer windows than this (or a one-worker pool) are featurised inline: the
+# shared-memory copy and IPC would cost more than the split saves.
+POOL_MIN_WINDOWS     = int(os.getenv("VOICE_POOL_MIN_WINDOWS", "4"))
+
+
+def _build_model():
+    """Registry loader: joblib payload {model, emotions, ...}."""
     if not os.path.exists(MODEL_PATH):
-        _MODEL_ERR = f"Model not found: {MODEL_PATH} — run train_voice_model.py first"
-        print(f"⚠️  {_MODEL_ERR}")
-        return None
+        msg = f"Model not found: {MODEL_PATH} — run train_voice_model.py first"
+        print(f"⚠️  {msg}")
+        raise FileNotFoundError(msg)
     try:
         import joblib
-        _MODEL_PAYLOAD = joblib.load(MODEL_PATH)
+        payload = joblib.load(MODEL_PATH)
         print(f"✅ Voice emotion model loaded from {MODEL_PATH}")
     except Exception as e:
-        _MODEL_ERR = str(e)
         print(f"⚠️  Could not load voice model: {e}")
-    return _MODEL_PAYLOAD
+        raise
+    return payload
 
 
-def _extract_features(audio_path: str) -> np.ndarray:
-    import librosa
-    y, sr = librosa.load(audio_path, sr=22050, duration=3.0)
-    target_len = 3 * sr
+registry.register("voice_model", _build_model)
+
+
+def _load_model():
+    return registry.get("voice_model")
+
+
+def warm_up():
+    """Load the model and build the cached spectral filterbanks at startup."""
+    _load_model()
+    warm_up_features()
+    try:
+        # JIT-compiles librosa's pitch/beat kernels (~1 s) ahead of the first quality=fast call.
+        noise = np.random.default_rng(0).standard_normal(int(CLIP_SEC * SR)).astype(np.float32)
+        _heuristic(0.05 * noise, SR)
+    except Exception as e:
+        print(f"⚠️  Voice heuristic warm-up failed: {e}")
+
+
+def _clip_features(y: np.ndarray, sr: int = SR) -> np.ndarray:
+    target_len = int(CLIP_SEC * sr)
     if len(y) < target_len:
         y = np.pad(y, (0, target_len - len(y)))
     else:
         y = y[:target_len]
+    # One STFT shared by MFCC / chroma / contrast / mel (ml/voice_features.py).
+    return feature_vector(y, sr)
+
+
+def _extract_features(audio, fmt: str | None = None) -> np.ndarray:
+    y, sr = load_audio(audio, sr=SR, duration=CLIP_SEC, fmt=fmt)
+    return _clip_features(y, sr)
+
+
+def _frame_rms(y: np.ndarray) -> np.ndarray:
+    n = len(y) // VAD_FRAME
+    if n == 0:
+        return np.sqrt(np.mean(np.square(y), keepdims=True)) if len(y) else np.zeros(0)
+    frames = y[: n * VAD_FRAME].reshape(n, VAD_FRAME).astype(np.float64)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+
+def _voiced(y: np.ndarray, sr: int = SR):
+    """
+    Energy VAD. Returns (trimmed, best_clip): `trimmed` drops leading and
+    trailing silence, `best_clip` is the CLIP_SEC window with the most
+    voiced energy. (None, None) when nothing clears the threshold.
+    A frame is voiced if its RMS is above VAD_MIN_RMS and within
+    VAD_REL_DB of the loudest frame.
+    """
+    rms = _frame_rms(y)
+    if not len(rms) or rms.max() < VAD_MIN_RMS:
+        return None, None
+    voiced = rms >= max(VAD_MIN_RMS, rms.max() * 10 ** (-VAD_REL_DB / 20))
+    idx = np.flatnonzero(voiced)
+    first = max(0, idx[0] - VAD_HANGOVER) * VAD_FRAME
+    last  = min(len(rms), idx[-1] + 1 + VAD_HANGOVER) * VAD_FRAME
+    if idx[-1] == len(rms) - 1:
+        last = len(y)  # keep the sub-frame tail
+    trimmed = y[first:last]
+
+    win = int(CLIP_SEC * sr)
+    if len(trimmed) <= win:
+        best = trimmed
+    else:
+        energy = np.where(voiced, rms ** 2, 0.0)[first // VAD_FRAME: last // VAD_FRAME]
+        span = win // VAD_FRAME
+        sums = np.convolve(energy, np.ones(span), mode="valid") if len(energy) > span else energy.sum(keepdims=True)
+        offset = min(int(np.argmax(sums)) * VAD_FRAME, len(trimmed) - win)
+        best = trimmed[offset: offset + win]
+    return trimmed, best
+
+
+def _no_speech(timings: dict) -> dict:
+    print("✅ Voice: no speech detected")
+    return {"emotion": "Calm", "confidence": 0.0, "source": "no_speech", "timings": timings}
+
+
+def _heuristic(y: np.ndarray, sr: int = SR) -> dict:
+    """Energy / pitch / tempo rules on a capped, decimated window of `y`."""
+    import librosa
+    from scipy.signal import resample_poly
+
+    y = y[: int(HEURISTIC_WINDOW_SEC * sr)]
+    if HEURISTIC_SR and HEURISTIC_SR < sr:
+        y = resample_poly(y, HEURISTIC_SR, sr).astype(np.float32)
+        sr = HEURISTIC_SR
+
+    energy   = float(np.mean(librosa.feature.rms(y=y)))
+    pitch    = float(np.mean(librosa.yin(y, fmin=80, fmax=400, sr=sr))) if len(y) > 2048 else 200
+    tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
+    tempo    = float(np.atleast_1d(tempo)[0])
+
+    if energy < 0.02:
+        emotion, conf = "Sad", 0.45
+    elif energy > 0.15 and tempo > 120:
+        emotion, conf = "Excited", 0.50
+    elif energy > 0.10:
+        emotion, conf = "Angry", 0.45
+    elif pitch > 250:
+        emotion, conf = "Happy", 0.40
+    else:
+        emotion, conf = "Calm", 0.35
+
+    print(f"✅ Voice (heuristic): energy={energy:.3f}, tempo={tempo:.0f} → {emotion}")
+    return {"emotion": emotion, "confidence": conf, "source": "heuristic"}
 
-    mfcc     = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=N_MFCC, hop_length=HOP_LEN)
-    mfcc_f   = np.concatenate([mfcc.mean(axis=1), mfcc.std(axis=1)])
-    chroma   = librosa.feature.chroma_stft(y=y, sr=sr, hop_length=HOP_LEN)
-    chroma_f = np.concatenate([chroma.mean(axis=1), chroma.std(axis=1)])
-    contrast = librosa.feature.spectral_contrast(y=y, sr=sr, hop_length=HOP_LEN)
-    cont_f   = np.concatenate([contrast.mean(axis=1), contrast.std(axis=1)])
-    mel      = librosa.feature.melspectrogram(y=y, sr=sr, n_mels=N_MELS, hop_length=HOP_LEN)
-    mel_f    = librosa.power_to_db(mel).mean(axis=1)
-    zcr      = librosa.feature.zero_crossing_rate(y, hop_length=HOP_LEN).mean()
-    rms      = librosa.feature.rms(y=y, hop_length=HOP_LEN).mean()
-    return np.concatenate([mfcc_f, chroma_f, cont_f, mel_f, [zcr, rms]])
-
-
-def detect_voice_emotion(audio_path: str) -> str:
-    """Return mood string from audio file path."""
-    result = detect_voice_emotion_full(audio_path)
+
+def detect_voice_emotion(audio, fmt: str | None = None, sample_rate: int | None = None,
+                         quality: str = "best") -> str:
+    """Return mood string from an audio path, bytes, file-like or array."""
+    result = detect_voice_emotion_full(audio, fmt=fmt, sample_rate=sample_rate, quality=quality)
     return result["emotion"]
 
 
-def detect_voice_emotion_full(audio_path: str) -> dict:
-    """Return dict with emotion, confidence, source."""
+def detect_voice_emotion_full(audio, fmt: str | None = None, sample_rate: int | None = None,
+                              quality: str = "best") -> dict:
+    """
+    Return dict with emotion, confidence, source, timings.
+    `audio` may be a file path, raw bytes, a file-like object or a numpy
+    waveform (at `sample_rate`, default 22050 Hz); `fmt` is a container
+    hint ("wav", "webm", ...).
+    quality="fast" skips the model and runs the energy heuristic on the
+    CLIP_SEC analysis window only; "balanced" and "best" start at the model.
+    """
+    if quality not in QUALITY_START:
+        raise ValueError(f"Unknown quality {quality!r} (expected fast, balanced or best)")
+    timings = {}
+    # Decode once: the model reads one CLIP_SEC window, the heuristic at most
+    # HEURISTIC_WINDOW_SEC of the same waveform.
+    try:
+        y, sr = load_audio(audio, sr=SR, duration=max(CLIP_SEC, HEURISTIC_WINDOW_SEC), fmt=fmt,
+                           source_sr=sample_rate, timings=timings)
+    except Exception as e:
+        print(f"❌ Voice decode error: {e}")
+        return {"emotion": "Calm", "confidence": 0.0, "source": "error", "timings": timings}
+
+    clip = y
+    if VAD_ENABLED:
+        start = time.perf_counter()
+        trimmed, clip = _voiced(y, sr)
+        timings["vad_ms"] = elapsed_ms(start)
+        if trimmed is None:
+            return _no_speech(timings)
+        y = trimmed
+
+    model_tier = QUALITY_START[quality] == "trained_model"
+    if not model_tier:
+        y = clip[:int(CLIP_SEC * sr)]
+
     # 1️⃣  Trained model
-    payload = _load_model()
+    payload = _load_model() if model_tier else None
     if payload is not None:
         try:
-            feat = _extract_features(audio_path).reshape(1, -1)
+            start = time.perf_counter()
+            feat = _clip_features(clip, sr).reshape(1, -1)
+            timings["features_ms"] = elapsed_ms(start)
+            start = time.perf_counter()
             model   = payload["model"]
             labels  = payload["emotions"]
             probs   = model.predict_proba(feat)[0]
+            timings["predict_ms"] = elapsed_ms(start)
+            registry.record_inference("voice_model", timings["predict_ms"])
             idx     = int(np.argmax(probs))
             emotion = labels[idx]
             conf    = float(probs[idx])
             print(f"✅ Voice (trained model): {emotion} ({conf:.2f})")
-            return {"emotion": emotion, "confidence": conf, "source": "trained_model"}
+            return {"emotion": emotion, "confidence": conf, "source": "trained_model", "timings": timings}
         except Exception as e:
             print(f"⚠️  Voice model inference failed: {e}")
 
     # 2️⃣  Librosa energy heuristic
     try:
-        import librosa
-        y, sr = librosa.load(audio_path)
-        energy   = float(np.mean(librosa.feature.rms(y=y)))
-        pitch    = float(np.mean(librosa.yin(y, fmin=80, fmax=400))) if len(y) > 2048 else 200
-        tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-        tempo    = float(tempo)
-
-        if energy < 0.02:
-            emotion, conf = "Sad", 0.45
-        elif energy > 0.15 and tempo > 120:
-            emotion, conf = "Excited", 0.50
-        elif energy > 0.10:
-            emotion, conf = "Angry", 0.45
-        elif pitch > 250:
-            emotion, conf = "Happy", 0.40
-        else:
-            emotion, conf = "Calm", 0.35
-
-        print(f"✅ Voice (heuristic): energy={energy:.3f}, tempo={tempo:.0f} → {emotion}")
-        return {"emotion": emotion, "confidence": conf, "source": "heuristic"}
+        start = time.perf_counter()
+        result = _heuristic(y, sr)
+        timings["heuristic_ms"] = elapsed_ms(start)
+        return {**result, "timings": timings}
     except Exception as e:
         print(f"❌ Voice analysis error: {e}")
-        return {"emotion": "Calm", "confidence": 0.0, "source": "error"}
+        return {"emotion": "Calm", "confidence": 0.0, "source": "error", "timings": timings}
+
+
+# ── Long-recording timeline ───────────────────────────────────────────────────
+def _windows(y: np.ndarray, sr: int, hop_sec: float):
+    """(starts, y) for overlapping CLIP_SEC windows covering `y` (padded if shorter)."""
+    win = int(CLIP_SEC * sr)
+    hop = max(1, int(hop_sec * sr))
+    if len(y) <= win:
+        return [0], np.pad(y, (0, win - len(y)))
+    starts = list(range(0, len(y) - win + 1, hop))
+    if starts[-1] + win < len(y):
+        starts.append(len(y) - win)  # last window flush with the end
+    return starts, y
+
+
+def _window_features(y: np.ndarray, starts: list, sr: int) -> np.ndarray:
+    win = int(CLIP_SEC * sr)
+    pool = get_voice_pool()
+    if pool is not None and pool.workers > 1 and len(starts) >= POOL_MIN_WINDOWS:
+        return pool.window_features(y, starts, win, sr)
+    return feature_matrix(np.stack([y[s:s + win] for s in starts]), sr)
+
+
+def timeline_audio(audio, fmt: str | None = None, sample_rate: int | None = None):
+    """(y, sr, voiced, timings): up to TIMELINE_MAX_SEC decoded at SR, plus the VAD verdict."""
+    timings = {}
+    y, sr = load_audio(audio, sr=SR, duration=TIMELINE_MAX_SEC, fmt=fmt,
+                       source_sr=sample_rate, timings=timings)
+    voiced = True
+    if VAD_ENABLED:
+        start = time.perf_counter()
+        voiced = _voiced(y, sr)[0] is not None
+        timings["vad_ms"] = elapsed_ms(start)
+    return y, sr, voiced, timings
+
+
+def analyze_voice_timeline(audio, fmt: str | None = None, hop_sec: float = TIMELINE_HOP_SEC,
+                           sample_rate: int | None = None) -> dict:
+    """
+    Per-window emotion timeline for a whole recording (up to VOICE_TIMELINE_MAX_SEC).
+    Returns { emotion, confidence, source, distribution, duration_sec,
+              timeline: [{start, end, emotion, confidence}], timings }.
+    The overall result averages window probabilities weighted by RMS energy,
+    so near-silent windows count for little.
+    """
+    # Decoding up to TIMELINE_MAX_SEC is the CPU-heavy part before the windows;
+    # with the pool it runs in a worker and only the waveform comes back.
+    pool = get_voice_pool()
+    if pool is not None:
+        y, sr, voiced, timings = pool.timeline_audio(audio, fmt=fmt, sample_rate=sample_rate)
+    else:
+        y, sr, voiced, timings = timeline_audio(audio, fmt=fmt, sample_rate=sample_rate)
+    duration = round(len(y) / sr, 2)
+
+    if not voiced:
+        return {**_no_speech(timings), "duration_sec": duration, "timeline": []}
+
+    payload = _load_model()
+    if payload is None:
+        result = pool.detect(y, sample_rate=sr) if pool is not None else detect_voice_emotion_full(y)
+        return {**result, "duration_sec": duration, "timeline": [], "timings": {**timings, **result["timings"]}}
+
+    starts, y = _windows(y, sr, hop_sec)
+
+    start = time.perf_counter()
+    feats = _window_features(y, starts, sr)
+    timings["features_ms"] = elapsed_ms(start)
+
+    start = time.perf_counter()
+    probs = payload["model"].predict_proba(feats)
+    timings["predict_ms"] = elapsed_ms(start)
+    registry.record_inference("voice_model", timings["predict_ms"], items=len(starts))
+
+    labels = list(payload["emotions"])
+    win = int(CLIP_SEC * sr)
+    power = np.concatenate([[0.0], np.cumsum(y.astype(np.float64) ** 2)])
+    energy = np.sqrt((power[np.add(starts, win)] - power[starts]) / win)
+    weights = energy if energy.sum() > 0 else np.ones(len(starts))
+    overall = (probs * weights[:, None]).sum(axis=0) / weights.sum()
+    idx = int(np.argmax(overall))
+
+    timeline = []
+    for s0, p in zip(starts, probs):
+        i = int(np.argmax(p))
+        timeline.append({
+            "start":      round(s0 / sr, 2),
+            "end":        round(min(s0 / sr + CLIP_SEC, duration), 2),
+            "emotion":    labels[i],
+            "confidence": round(float(p[i]), 4),
+        })
 
+    return {
+        "emotion":      labels[idx],
+        "confidence":   float(overall[idx]),
+        "source":       "trained_model",
+        "distribution": {labels[i]: round(float(overall[i]), 4) for i in np.argsort(-overall)},
+        "duration_sec": duration,
+        "timeline":     timeline,
+        "timings":      timings,
+    }
@@ -0,0 +1,217 @@
+"""
+Shared spectral front-end for voice emotion features.
+
+The feature vector the voice model was trained on (see
+voice_emotion._extract_features) used to come from four librosa calls,
+each computing its own STFT / mel spectrogram over the same clip. Here one
+STFT feeds everything:
+
+  |STFT|        -> spectral contrast
+  |STFT|²       -> mel (cached filterbank) -> dB -> MFCC (cached DCT matrix)
+                -> chroma (filterbank cached per estimated tuning)
+
+Output is numerically compatible with the librosa 0.10 calls it replaces
+(same n_fft=2048, hop=512, centred, zero-padded frames):
+40 MFCC means + 40 stds, 12 + 12 chroma, 7 + 7 contrast, 128 mel dB means,
+zero-crossing rate and RMS = 248 values.
+"""
+
+import functools
+import numpy as np
+
+SR      = 22050
+N_FFT   = 2048
+HOP_LEN = 512
+N_MFCC  = 40
+N_MELS  = 128
+N_CHROMA = 12
+
+
+@functools.lru_cache(maxsize=4)
+def mel_basis(sr: int = SR, n_fft: int = N_FFT, n_mels: int = N_MELS) -> np.ndarray:
+    import librosa
+    return librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels)
+
+
+@functools.lru_cache(maxsize=4)
+def dct_matrix(n_mfcc: int = N_MFCC, n_mels: int = N_MELS) -> np.ndarray:
+    """Orthonormal DCT-II rows, so MFCC = dct_matrix @ mel_db."""
+    import scipy.fft
+    return scipy.fft.dct(np.eye(n_mels), type=2, norm="ortho", axis=0)[:n_mfcc]
+
+
+@functools.lru_cache(maxsize=256)
+def chroma_basis(tuning: float, sr: int = SR, n_fft: int = N_FFT) -> np.ndarray:
+    # estimate_tuning() resolves to 0.01 bins, so this cache stays small.
+    import librosa
+    return librosa.filters.chroma(sr=sr, n_fft=n_fft, tuning=tuning, n_chroma=N_CHROMA)
+
+
+def warm_up(sr: int = SR):
+    """Build the cached filterbanks/DCT matrices ahead of the first request."""
+    mel_basis(sr)
+    dct_matrix()
+    chroma_basis(0.0, sr)
+
+
+def spectrogram(y: np.ndarray):
+    """(magnitude, power) spectrograms from a single centred STFT."""
+    import librosa
+    mag = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LEN, center=True, pad_mode="constant"))
+    return mag, mag ** 2
+
+
+def frame_features(y: np.ndarray, sr: int = SR) -> dict:
+    """
+    Per-frame feature matrices for one clip:
+    mfcc (40×T), chroma (12×T), contrast (7×T), mel_db (128×T), zcr (T), rms (T).
+    """
+    import librosa
+
+    mag, power = spectrogram(y)
+
+    mel    = mel_basis(sr) @ power
+    mel_db = librosa.power_to_db(mel)
+    mfcc   = dct_matrix() @ mel_db
+
+    tuning = librosa.estimate_tuning(S=power, sr=sr, bins_per_octave=N_CHROMA)
+    chroma = librosa.util.normalize(chroma_basis(float(tuning), sr) @ power, norm=np.inf, axis=-2)
+
+    contrast = librosa.feature.spectral_contrast(S=mag, sr=sr, n_fft=N_FFT, hop_length=HOP_LEN)
+    zcr = librosa.feature.zero_crossing_rate(y, hop_length=HOP_LEN)[0]
+    rms = librosa.feature.rms(y=y, hop_length=HOP_LEN)[0]
+    return {"mfcc": mfcc, "chroma": chroma, "contrast": contrast, "mel_db": mel_db, "zcr": zcr, "rms": rms}
+
+
+def feature_vector(y: np.ndarray, sr: int = SR) -> np.ndarray:
+    """The 248-value vector voice_emotion_model.pkl expects."""
+    f = frame_features(y, sr)
+    return np.concatenate([
+        f["mfcc"].mean(axis=1),     f["mfcc"].std(axis=1),
+        f["chroma"].mean(axis=1),   f["chroma"].std(axis=1),
+        f["contrast"].mean(axis=1), f["contrast"].std(axis=1),
+        f["mel_db"].mean(axis=1),
+        [f["zcr"].mean(), f["rms"].mean()],
+    ])
+
+
+def feature_matrix(windows: np.ndarray, sr: int = SR) -> np.ndarray:
+    """feature_vector() for each row of a (n_windows, n_samples) array."""
+    return np.stack([feature_vector(w, sr) for w in windows])
+
+
+class RunningFeatures:
+    """
+    Streaming counterpart of feature_vector(): push() PCM chunks as they
+    arrive, read vector() at any point.
+
+    Frames are cut exactly as the centred STFT would cut the concatenated
+    signal (N_FFT // 2 zeros in front, hop HOP_LEN), and each frame's
+    features are folded into running sums / sums of squares, so a push
+    costs O(chunk) and memory stays constant. Two whole-clip steps become
+    causal approximations:
+      - power_to_db's top_db=80 floor uses the running maximum
+      - chroma tuning is estimated once from the first TUNING_FRAMES frames
+    """
+
+    TUNING_FRAMES = 1 + 3 * SR // HOP_LEN  # one 3 s clip
+
+    def __init__(self, sr: int = SR):
+        self.sr       = sr
+        self.samples  = 0
+        self.frames   = 0
+        self.tuning   = None
+        self._buf     = np.zeros(N_FFT // 2, dtype=np.float32)
+        self._db_max  = -np.inf
+        self._pending = []  # power frames held back until tuning is known
+        self._chroma_frames = 0
+        self._sum = {}
+        self._sq  = {}
+
+    def push(self, y: np.ndarray) -> int:
+        """Add samples; returns the number of complete frames processed."""
+        self.samples += len(y)
+        self._buf = np.concatenate([self._buf, np.asarray(y, dtype=np.float32)])
+        if len(self._buf) < N_FFT:
+            return 0
+        n = 1 + (len(self._buf) - N_FFT) // HOP_LEN
+        self._process(self._buf[: (n - 1) * HOP_LEN + N_FFT])
+        self._buf = self._buf[n * HOP_LEN:]
+        return n
+
+    def finish(self) -> int:
+        """Flush the trailing frames of the centred STFT (end padding)."""
+        remaining = 1 + self.samples // HOP_LEN - self.frames
+        if remaining <= 0:
+            return 0
+        needed = (remaining - 1) * HOP_LEN + N_FFT
+        self._process(np.pad(self._buf, (0, max(0, needed - len(self._buf))))[:needed])
+        self._buf = self._buf[:0]
+        self._resolve_tuning()
+        return remaining
+
+    def _add(self, key: str, values: np.ndarray):
+        """values: (dims, frames)."""
+        s, q = values.sum(axis=1), (values.astype(np.float64) ** 2).sum(axis=1)
+        if key in self._sum:
+            self._sum[key] += s
+            self._sq[key]  += q
+        else:
+            self._sum[key], self._sq[key] = s.astype(np.float64), q
+
+    def _process(self, seg: np.ndarray):
+        import librosa
+
+        mag = np.abs(librosa.stft(seg, n_fft=N_FFT, hop_length=HOP_LEN, center=False))
+        power = mag ** 2
+
+        mel_db = 10.0 * np.log10(np.maximum(1e-10, mel_basis(self.sr) @ power))
+        self._db_max = max(self._db_max, float(mel_db.max()))
+        mel_db = np.maximum(mel_db, self._db_max - 80.0)
+        self._add("mel_db", mel_db)
+        self._add("mfcc", dct_matrix() @ mel_db)
+        self._add("contrast", librosa.feature.spectral_contrast(S=mag, sr=self.sr, n_fft=N_FFT, hop_length=HOP_LEN))
+        self._add("zcr", librosa.feature.zero_crossing_rate(seg, frame_length=N_FFT, hop_length=HOP_LEN, center=False))
+        self._add("rms", librosa.feature.rms(y=seg, frame_length=N_FFT, hop_length=HOP_LEN, center=False))
+        self.frames += mag.shape[1]
+
+        if self.tuning is None:
+            self._pending.append(power)
+            if sum(p.shape[1] for p in self._pending) >= self.TUNING_FRAMES:
+                self._resolve_tuning()
+        else:
+            self._add_chroma(power)
+
+    def _add_chroma(self, power: np.ndarray):
+        import librosa
+        chroma = librosa.util.normalize(chroma_basis(self.tuning, self.sr) @ power, norm=np.inf, axis=-2)
+        self._add("chroma", chroma)
+        self._chroma_frames += power.shape[1]
+
+    def _resolve_tuning(self):
+        if self.tuning is not None or not self._pending:
+            return
+        import librosa
+        power = np.concatenate(self._pending, axis=1)
+        self._pending = []
+        self.tuning = float(librosa.estimate_tuning(S=power, sr=self.sr, bins_per_octave=N_CHROMA))
+        self._add_chroma(power)
+
+    def vector(self) -> np.ndarray | None:
+        """Current 248-value feature vector (None before the first frame)."""
+        if not self.frames:
+            return None
+        self._resolve_tuning()
+
+        def mean_std(key, n):
+            mean = self._sum[key] / n
+            return mean, np.sqrt(np.maximum(self._sq[key] / n - mean ** 2, 0.0))
+
+        mfcc_m, mfcc_s = mean_std("mfcc", self.frames)
+        chroma_m, chroma_s = mean_std("chroma", self._chroma_frames)
+        cont_m, cont_s = mean_std("contrast", self.frames)
+        return np.concatenate([
+            mfcc_m, mfcc_s, chroma_m, chroma_s, cont_m, cont_s,
+            self._sum["mel_db"] / self.frames,
+            self._sum["zcr"] / self.frames, self._sum["rms"] / self.frames,
+        ])
@@ -0,0 +1,303 @@
+"""
+Worker-process pool for voice analysis.
+
+librosa feature extraction and the pitch/tempo heuristics are CPU-bound
+and hold the GIL for long stretches, so running them on a Flask request
+thread stalls every other request in the process. VoicePool moves that
+work into worker processes instead:
+
+  - workers are spawned and warmed at start(): each loads the voice model
+    and builds the cached filterbanks once (voice_emotion.warm_up)
+  - audio is handed over in multiprocessing.shared_memory blocks; only a
+    (name, dtype, shape) reference is pickled, results come back as the
+    usual small dicts / feature matrices
+  - jobs: whole-clip detection, a timeline's decode/resample/VAD and its
+    window features, and each live-stream chunk's STFT + scoring (the
+    session's RunningFeatures state is pickled to the worker and back; the
+    soxr resampler state cannot be, so stream resampling stays in-process)
+  - at most VOICE_POOL_QUEUE jobs may be in flight; beyond that submit()
+    raises VoicePoolBusy instead of queueing without bound
+  - VOICE_POOL_WORKERS defaults to min(2, usable CPUs), not the host core
+    count: every worker is a separate interpreter holding its own voice
+    model and librosa state, and that RSS is outside the model registry's
+    memory budget
+
+VOICE_POOL=0 keeps everything inline in the calling thread.
+"""
+
+import atexit
+import math
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+
+def _default_workers() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))  # honours taskset/cpuset limits
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(1, min(2, cpus))
+
+
+ENABLED     = os.getenv("VOICE_POOL", "1").lower() not in ("0", "false", "no")
+WORKERS     = int(os.getenv("VOICE_POOL_WORKERS", "0")) or _default_workers()
+MAX_QUEUE   = int(os.getenv("VOICE_POOL_QUEUE", "0")) or 4 * WORKERS
+TIMEOUT_SEC = float(os.getenv("VOICE_POOL_TIMEOUT_SEC", "60"))
+
+_in_worker = False
+
+
+class VoicePoolBusy(RuntimeError):
+    pass
+
+
+# ── Worker side ───────────────────────────────────────────────────────────────
+def _init_worker():
+    global _in_worker
+    _in_worker = True
+    from ml.voice_emotion import warm_up
+    warm_up()
+
+
+def _ping():
+    return os.getpid()
+
+
+def _attach(ref):
+    """Copy a shared-memory block out as bytes or an ndarray."""
+    name, dtype, shape = ref
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        if dtype is None:
+            return bytes(shm.buf[:shape])
+        return np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+
+
+def _source(src):
+    """Worker-side audio: a file path as-is, a shared-memory ref copied out."""
+    return _attach(src) if isinstance(src, tuple) else src
+
+
+def _run_detect(src, fmt, sample_rate, quality):
+    from ml.voice_emotion import detect_voice_emotion_full
+    return detect_voice_emotion_full(_source(src), fmt=fmt, sample_rate=sample_rate, quality=quality)
+
+
+def _run_timeline_audio(src, fmt, sample_rate):
+    from ml.voice_emotion import timeline_audio
+    return timeline_audio(_source(src), fmt=fmt, sample_rate=sample_rate)
+
+
+def _run_stream_step(features, pcm, final, windows):
+    from ml.voice_stream import advance
+    return advance(features, pcm, final, windows)
+
+
+def _run_window_features(ref, starts, win, sr):
+    from ml.voice_features import feature_matrix
+    y = _attach(ref)
+    return feature_matrix(np.stack([y[s:s + win] for s in starts]), sr)
+
+
+# ── Parent side ───────────────────────────────────────────────────────────────
+def _share(data):
+    """Place bytes / ndarray in a new shared-memory block -> (shm, ref)."""
+    if isinstance(data, np.ndarray):
+        data = np.ascontiguousarray(data)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, data.nbytes))
+        np.ndarray(data.shape, dtype=data.dtype, buffer=shm.buf)[...] = data
+        return shm, (shm.name, data.dtype.str, data.shape)
+    data = bytes(data)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+    shm.buf[:len(data)] = data
+    return shm, (shm.name, None, len(data))
+
+
+def _free_when_done(shm, futures):
+    """
+    Unlink a shared block once no job can still attach to it. Queued jobs
+    are cancelled; jobs already running (e.g. after a _timed timeout) keep
+    the block until they finish, without holding up the caller.
+    """
+    for f in futures:
+        f.cancel()
+    pending = [f for f in futures if not f.done()]
+    if not pending:
+        shm.close()
+        shm.unlink()
+        return
+    lock = threading.Lock()
+    left = [len(pending)]
+
+    def _done(_):
+        with lock:
+            left[0] -= 1
+            if left[0]:
+                return
+        shm.close()
+        shm.unlink()
+
+    for f in pending:
+        f.add_done_callback(_done)
+
+
+class VoicePool:
+    def __init__(self, workers: int = WORKERS, max_queue: int = MAX_QUEUE):
+        self.workers    = max(1, workers)
+        self.max_queue  = max(1, max_queue)
+        self._executor  = None
+        self._lock      = threading.Lock()
+        self._slots     = threading.BoundedSemaphore(self.max_queue)
+        self._stats_lock = threading.Lock()
+        self.in_flight  = 0
+        self.jobs       = 0
+        self.rejected   = 0
+        self.errors     = 0
+        self.run_ms_sum = 0.0
+
+    def start(self):
+        """Spawn the workers and start warming them (returns immediately)."""
+        if self._executor is not None:
+            return self._executor
+        with self._lock:
+            if self._executor is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # spawn: forking a process that already runs TF/torch threads is unsafe.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+                for _ in range(self.workers):
+                    self._executor.submit(_ping)
+                atexit.register(self._executor.shutdown, wait=False, cancel_futures=True)
+        return self._executor
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.rejected += 1
+            raise VoicePoolBusy(f"Voice pool queue full ({self.max_queue} jobs in flight)")
+        with self._stats_lock:
+            self.in_flight += 1
+        try:
+            future = self.start().submit(fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        self._slots.release()
+        failed = future is None or future.cancelled() or future.exception() is not None
+        with self._stats_lock:
+            self.in_flight -= 1
+            self.jobs      += 1
+            self.errors    += int(failed)
+
+    def _reset(self, executor):
+        """Drop a broken executor (a worker died) so the next job respawns the pool."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def detect(self, audio, fmt: str | None = None, sample_rate: int | None = None,
+               quality: str = "best") -> dict:
+        """detect_voice_emotion_full() in a worker process."""
+        return self._on_audio(_run_detect, audio, fmt, sample_rate, quality)
+
+    def timeline_audio(self, audio, fmt: str | None = None, sample_rate: int | None = None):
+        """voice_emotion.timeline_audio() (decode, resample, VAD) in a worker process."""
+        return self._on_audio(_run_timeline_audio, audio, fmt, sample_rate)
+
+    def stream_step(self, features, pcm: np.ndarray, final: bool, windows: int):
+        """voice_stream.advance() in a worker; the session's feature state travels both ways."""
+        return self._timed(self._submit(_run_stream_step, features, pcm, final, windows))
+
+    def _on_audio(self, fn, audio, *args):
+        """fn(src, *args) in a worker: paths are passed as-is, bytes/arrays via shared memory."""
+        if hasattr(audio, "read"):
+            audio = audio.read()
+        if isinstance(audio, (str, os.PathLike)):
+            return self._timed(self._submit(fn, os.fspath(audio), *args))
+        shm, ref = _share(audio)
+        futures = []
+        try:
+            futures.append(self._submit(fn, ref, *args))
+            return self._timed(futures[0])
+        finally:
+            _free_when_done(shm, futures)
+
+    def window_features(self, y: np.ndarray, starts: list, win: int, sr: int) -> np.ndarray:
+        """Feature matrix for y[s:s+win] for each start, split across the workers."""
+        size = math.ceil(len(starts) / self.workers)
+        shm, ref = _share(np.asarray(y, dtype=np.float32))
+        futures = []
+        try:
+            for i in range(0, len(starts), size):
+                futures.append(self._submit(_run_window_features, ref, starts[i:i + size], win, sr))
+            return np.concatenate([self._timed(f) for f in futures])
+        finally:
+            _free_when_done(shm, futures)
+
+    def _timed(self, future):
+        from concurrent.futures.process import BrokenProcessPool
+
+        start = time.perf_counter()
+        executor = self._executor
+        try:
+            return future.result(TIMEOUT_SEC)
+        except BrokenProcessPool:
+            if executor is not None:
+                self._reset(executor)
+            raise
+        finally:
+            with self._stats_lock:
+                self.run_ms_sum += (time.perf_counter() - start) * 1000
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "workers":    self.workers,
+                "started":    self._executor is not None,
+                "max_queue":  self.max_queue,
+                "in_flight":  self.in_flight,
+                "jobs":       self.jobs,
+                "rejected":   self.rejected,
+                "errors":     self.errors,
+                "avg_job_ms": round(self.run_ms_sum / max(self.jobs, 1), 2),
+            }
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def get_voice_pool() -> VoicePool | None:
+    """Process-wide pool (None when disabled or inside a pool worker)."""
+    global _default_pool
+    if not ENABLED or _in_worker:
+        return None
+    if _default_pool is None:
+        with _default_lock:
+            if _default_pool is None:
+                _default_pool = VoicePool()
+    return _default_pool
+
+
+def detect_voice_emotion_pooled(audio, fmt: str | None = None, sample_rate: int | None = None,
+                                quality: str = "best") -> dict:
+    """Drop-in for detect_voice_emotion_full() that runs in the pool when enabled."""
+    pool = get_voice_pool()
+    if pool is None:
+        from ml.voice_emotion import detect_voice_emotion_full
+        return detect_voice_emotion_full(audio, fmt=fmt, sample_rate=sample_rate, quality=quality)
+    return pool.detect(audio, fmt=fmt, sample_rate=sample_rate, quality=quality)
@@ -0,0 +1,179 @@
+"""
+Live voice emotion over chunked PCM.
+
+A VoiceStream takes audio as it is captured rather than after the whole
+recording has been uploaded:
+
+  - each chunk is folded into running MFCC / chroma / contrast / mel
+    statistics (ml.voice_features.RunningFeatures), O(chunk) per push
+  - every VOICE_STREAM_WINDOW_SEC of audio the model scores the running
+    statistics and a provisional emotion is returned
+  - the final chunk only flushes the last few STFT frames, so the final
+    answer costs one predict_proba call
+  - with the voice pool enabled, the STFT and scoring of each chunk run in
+    a worker process (ml/voice_pool.py); only resampling stays in-process
+
+Sessions live in a VoiceStreamStore, expire after VOICE_STREAM_TTL_SEC of
+inactivity and are capped at VOICE_STREAM_MAX_SESSIONS (oldest dropped).
+Session ids are always issued here; a client can only resume an id it was
+given, never pick one.
+"""
+
+import os
+import threading
+import time
+import uuid
+import numpy as np
+from ml.audio_io import StreamResampler
+from ml.timing import elapsed_ms
+from ml.voice_features import SR, RunningFeatures
+from ml.voice_pool import get_voice_pool
+
+WINDOW_SEC   = float(os.getenv("VOICE_STREAM_WINDOW_SEC", "3.0"))
+TTL_SEC      = float(os.getenv("VOICE_STREAM_TTL_SEC", "120"))
+MAX_SESSIONS = int(os.getenv("VOICE_STREAM_MAX_SESSIONS", "100"))
+
+
+def advance(features: RunningFeatures, pcm: np.ndarray, final: bool, windows: int):
+    """
+    Fold one (already resampled) chunk into `features` and score it when a
+    new WINDOW_SEC window completed or the stream ends.
+    Returns (features, windows, prediction or None, timings); runs in a
+    voice pool worker when the pool is enabled.
+    """
+    from ml.voice_emotion import _load_model
+
+    timings = {}
+    start = time.perf_counter()
+    features.push(pcm)
+    if final:
+        features.finish()
+    timings["features_ms"] = elapsed_ms(start)
+
+    now = features.samples // int(WINDOW_SEC * SR)
+    prediction = None
+    if now > windows or final:
+        start = time.perf_counter()
+        prediction = _predict(features, _load_model())
+        timings["predict_ms"] = elapsed_ms(start)
+    return features, now, prediction, timings
+
+
+def _predict(features: RunningFeatures, payload) -> dict:
+    vec = features.vector()
+    if payload is None or vec is None:
+        return {"emotion": "Calm", "confidence": 0.0, "source": "fallback"}
+    probs  = payload["model"].predict_proba(vec.reshape(1, -1))[0]
+    labels = list(payload["emotions"])
+    idx    = int(np.argmax(probs))
+    return {
+        "emotion":      labels[idx],
+        "confidence":   float(probs[idx]),
+        "source":       "trained_model",
+        "distribution": {labels[i]: round(float(probs[i]), 4) for i in np.argsort(-probs)},
+    }
+
+
+class VoiceStream:
+    """Per-session running feature statistics + latest estimate."""
+
+    def __init__(self, session_id: str, sample_rate: int = SR):
+        self.session_id  = session_id
+        self.sample_rate = sample_rate
+        self.lock        = threading.Lock()
+        self.chunks      = 0
+        self.windows     = 0
+        self.last_seen   = time.time()
+        self.finished    = False
+        self._features   = RunningFeatures(SR)
+        self._resampler  = StreamResampler(sample_rate, SR) if sample_rate != SR else None
+        self._last       = None
+
+    def push(self, pcm: np.ndarray, final: bool = False) -> dict:
+        """Add one chunk of mono float32 PCM at self.sample_rate."""
+        with self.lock:
+            if self.finished:
+                raise ValueError("Stream already finished")
+            self.chunks   += 1
+            self.last_seen = time.time()
+            timings = {}
+
+            if self._resampler is not None:
+                start = time.perf_counter()
+                pcm = self._resampler.process(pcm, last=final)
+                timings["resample_ms"] = elapsed_ms(start)
+
+            # STFT + scoring run in a voice worker when the pool is on.
+            pool = get_voice_pool()
+            if pool is not None:
+                step = pool.stream_step(self._features, pcm, final, self.windows)
+            else:
+                step = advance(self._features, pcm, final, self.windows)
+            self._features, windows, prediction, step_timings = step
+            timings.update(step_timings)
+            self.finished = final
+
+            provisional = windows > self.windows
+            self.windows = windows
+            if prediction is not None:
+                self._last = prediction
+
+            return {
+                **(self._last or {"emotion": None, "confidence": 0.0, "source": None}),
+                "final":        final,
+                "provisional":  provisional and not final,
+                "duration_sec": round(self._features.samples / SR, 2),
+                "windows":      self.windows,
+                "timings":      timings,
+            }
+
+    def stats(self) -> dict:
+        return {
+            "session_id":   self.session_id,
+            "chunks":       self.chunks,
+            "windows":      self.windows,
+            "duration_sec": round(self._features.samples / SR, 2),
+            "finished":     self.finished,
+        }
+
+
+class VoiceStreamStore:
+    """Session id → VoiceStream, with idle expiry and a session cap."""
+
+    def __init__(self, ttl_sec: float = TTL_SEC, max_sessions: int = MAX_SESSIONS):
+        self.ttl_sec      = ttl_sec
+        self.max_sessions = max_sessions
+        self._sessions    = {}
+        self._lock        = threading.Lock()
+
+    def get_or_create(self, session_id: str | None = None, sample_rate: int = SR) -> VoiceStream:
+        """The live session for session_id; unknown or expired ids get a new server-issued one."""
+        with self._lock:
+            self._expire()
+            if session_id and session_id in self._sessions:
+                return self._sessions[session_id]
+            session_id = uuid.uuid4().hex
+            if len(self._sessions) >= self.max_sessions:
+                oldest = min(self._sessions.values(), key=lambda s: s.last_seen)
+                self._sessions.pop(oldest.session_id, None)
+            stream = VoiceStream(session_id, sample_rate)
+            self._sessions[session_id] = stream
+            return stream
+
+    def close(self, session_id: str):
+        with self._lock:
+            stream = self._sessions.pop(session_id, None)
+        return stream.stats() if stream else None
+
+    def _expire(self):
+        now = time.time()
+        for sid, stream in list(self._sessions.items()):
+            if now - stream.last_seen > self.ttl_sec:
+                self._sessions.pop(sid, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"active_sessions": len(self._sessions)}
+
+
+voice_streams = VoiceStreamStore()